@@ -1,7 +1,15 @@
 """FastAPI main application."""
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import alerts, flows, stats
+from api.routes import alerts, flows, stats, export
+from api.models.database import get_async_database
+from api.models.indexes import ensure_indexes_async
+from api.models.pagination import NEXT_CURSOR_HEADER
+from api.models.live_feed import LiveFeed
+from api.models.request_metrics import RequestMetricsMiddleware
+from pipeline.metrics import metrics_enabled, render_metrics
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -25,12 +33,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the dashboard read the keyset pagination cursor
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Latency per route for /metrics (outermost, so CORS handling is included)
+app.add_middleware(RequestMetricsMiddleware)
+
 # Include routers
 app.include_router(alerts.router)
 app.include_router(flows.router)
 app.include_router(stats.router)
+app.include_router(export.router)
+
+# Pushes new alerts and stats changes to connected dashboards
+live_feed = LiveFeed()
+
+
+@app.on_event("startup")
+async def create_indexes():
+    """Ensure the route indexes in the background so startup does not wait on MongoDB."""
+    app.state.index_task = asyncio.create_task(ensure_indexes_async(get_async_database()))
+
+
+@app.on_event("startup")
+async def start_live_feed():
+    """Start following alerts and stats for /api/stream."""
+    live_feed.start(get_async_database())
+
+
+@app.on_event("shutdown")
+async def stop_live_feed():
+    """Stop the live feed tasks."""
+    await live_feed.stop()
 
 
 @app.get("/")
@@ -43,14 +78,41 @@ async def root():
     }
 
 
+@app.get("/api/stream")
+async def stream(request: Request):
+    """
+    Server-sent events for the dashboard.
+    
+    Events:
+        alerts: List of newly inserted alerts, oldest first
+        stats: Changed fields of the alert summary plus total_flows (the
+            first event carries every field)
+        resync: Events were dropped because the client fell behind; reload
+    """
+    return StreamingResponse(
+        live_feed.events(request.is_disconnected),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics of this API process (all workers with PROMETHEUS_MULTIPROC_DIR)."""
+    if not metrics_enabled():
+        raise HTTPException(status_code=501, detail="Metrics require the prometheus-client package")
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint."""
-    from api.models.database import get_database
     try:
-        db = get_database()
+        db = get_async_database()
         # Try to ping the database
-        db.client.admin.command('ping')
+        await db.client.admin.command('ping')
         return {"status": "healthy", "database": "connected"}
     except Exception as e:
         return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
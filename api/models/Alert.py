@@ -1,22 +1,31 @@
 """Pydantic models for alerts."""
-from pydantic import BaseModel
-from typing import Optional, Dict
+from pydantic import BaseModel, Field, field_serializer
+from typing import Optional, Dict, List
 from datetime import datetime
+from pipeline.timestamps import format_timestamp
 
 
 class Alert(BaseModel):
     """Anomaly alert model."""
-    timestamp: str
+    timestamp: datetime
     src_ip: str
     dst_ip: str
     protocol: str
     score: float
     model: str
+    model_version: Optional[str] = None
     features: Optional[Dict] = None
     status: Optional[str] = "new"
     id: Optional[str] = None
     
+    @field_serializer("timestamp")
+    def serialize_timestamp(self, value):
+        # Stored as a BSON date, returned to clients as an ISO string
+        return format_timestamp(value)
+    
     class Config:
+        # model_version is a field, not pydantic's model_ namespace
+        protected_namespaces = ()
         json_schema_extra = {
             "example": {
                 "timestamp": "2025-11-01T12:00:00Z",
@@ -25,6 +34,7 @@ class Alert(BaseModel):
                 "protocol": "TCP",
                 "score": 0.85,
                 "model": "isolation_forest",
+                "model_version": "v0003",
                 "features": {
                     "bytes": 50000,
                     "packets": 100,
@@ -34,3 +44,39 @@ class Alert(BaseModel):
             }
         }
 
+
+
+class AlertStatusBulkUpdate(BaseModel):
+    """Status change for a list of alert IDs."""
+    ids: List[str] = Field(..., min_length=1, max_length=10000)
+    status: str
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids": ["6543a1f0c2b5e1a2b3c4d5e6", "6543a1f0c2b5e1a2b3c4d5e7"],
+                "status": "resolved"
+            }
+        }
+
+
+class AlertStatusFilterUpdate(BaseModel):
+    """Status change for every alert matching a filter."""
+    status: str
+    src_ip: Optional[str] = None
+    dst_ip: Optional[str] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    min_score: Optional[float] = None
+    max_score: Optional[float] = None
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status": "acknowledged",
+                "src_ip": "10.10.0.25",
+                "start": "2025-11-01T12:00:00Z",
+                "end": "2025-11-01T13:00:00Z",
+                "min_score": 0.6
+            }
+        }
@@ -1,12 +1,13 @@
 """Pydantic models for flow records."""
-from pydantic import BaseModel
+from pydantic import BaseModel, field_serializer
 from typing import Optional
 from datetime import datetime
+from pipeline.timestamps import format_timestamp
 
 
 class FlowRecord(BaseModel):
     """Network flow record model."""
-    timestamp: str
+    timestamp: datetime
     src_ip: str
     dst_ip: str
     protocol: str
@@ -16,6 +17,11 @@ class FlowRecord(BaseModel):
     src_port: Optional[int] = None
     dst_port: Optional[int] = None
     
+    @field_serializer("timestamp")
+    def serialize_timestamp(self, value):
+        # Stored as a BSON date, returned to clients as an ISO string
+        return format_timestamp(value)
+    
     class Config:
         json_schema_extra = {
             "example": {
@@ -0,0 +1,149 @@
+"""Alert summary counters maintained with $inc alongside writes to anomalies."""
+from collections import Counter
+from api.models.database import write_collection
+
+COUNTERS_COLLECTION = "counters"
+ALERT_COUNTERS_ID = "alerts"
+ALERT_STATUSES = ("new", "acknowledged", "resolved")
+ALERT_COUNTERS = ("total",) + ALERT_STATUSES + ("score_sum", "score_n")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def alert_increments(alerts):
+    """
+    $inc document recording newly inserted alerts.
+
+    Only numeric scores are summed and score_n counts them, mirroring how
+    $avg skips missing and non-numeric fields.
+    """
+    inc = Counter()
+    for alert in alerts:
+        inc["total"] += 1
+        status = alert.get("status", "new")
+        if status in ALERT_STATUSES:
+            inc[status] += 1
+        if _is_number(alert.get("score")):
+            inc["score_sum"] += alert["score"]
+            inc["score_n"] += 1
+    return dict(inc)
+
+
+def status_move(old_status, new_status, n=1):
+    """$inc document moving n alerts from old_status to new_status."""
+    inc = Counter()
+    if old_status in ALERT_STATUSES:
+        inc[old_status] -= n
+    if new_status in ALERT_STATUSES:
+        inc[new_status] += n
+    return {status: delta for status, delta in inc.items() if delta}
+
+
+def increment_alert_counters(db, inc, kind=None):
+    """Apply an $inc document to the counters (synchronous pymongo)."""
+    if inc:
+        write_collection(db, COUNTERS_COLLECTION, kind).update_one({"_id": ALERT_COUNTERS_ID}, {"$inc": inc}, upsert=True)
+
+
+async def increment_alert_counters_async(db, inc, kind=None):
+    """
+    Apply an $inc document to the counters (motor).
+
+    kind selects the write concern (see WRITE_CONCERNS); triage passes
+    "triage" so counter moves are as durable as the status changes.
+    """
+    if inc:
+        await write_collection(db, COUNTERS_COLLECTION, kind).update_one({"_id": ALERT_COUNTERS_ID}, {"$inc": inc}, upsert=True)
+
+
+async def read_alert_counters(db):
+    """Current counters as a dict of ALERT_COUNTERS (zeros before the first alert)."""
+    doc = await db[COUNTERS_COLLECTION].find_one({"_id": ALERT_COUNTERS_ID}) or {}
+    return {field: doc.get(field, 0) for field in ALERT_COUNTERS}
+
+
+def count_alerts(db):
+    """
+    Compute the counters from the anomalies collection in one aggregation.
+
+    Returns:
+        dict: ALERT_COUNTERS as stored in the counters document
+    """
+    pipeline = [
+        {"$group": {
+            "_id": "$status",
+            "total": {"$sum": 1},
+            "score_sum": {"$sum": {"$cond": [{"$isNumber": "$score"}, "$score", 0]}},
+            "score_n": {"$sum": {"$cond": [{"$isNumber": "$score"}, 1, 0]}}
+        }}
+    ]
+    counts = dict.fromkeys(ALERT_COUNTERS, 0)
+    for doc in db["anomalies"].aggregate(pipeline, allowDiskUse=True):
+        counts["total"] += doc["total"]
+        counts["score_sum"] += doc["score_sum"]
+        counts["score_n"] += doc["score_n"]
+        if doc["_id"] in ALERT_STATUSES:
+            counts[doc["_id"]] += doc["total"]
+    return counts
+
+
+def reconcile_alert_counters(db, dry_run=False):
+    """
+    Rebuild the counters from the anomalies collection and report drift.
+
+    Alerts written between the scan and the write are counted twice or not
+    at all, so reconcile while consumers and triage are quiet (or run it
+    again afterwards and check the drift is zero).
+
+    Returns:
+        dict: field -> (stored, actual) for every counter that drifted
+    """
+    actual = count_alerts(db)
+    stored = db[COUNTERS_COLLECTION].find_one({"_id": ALERT_COUNTERS_ID}) or {}
+    drift = {}
+    for field in ALERT_COUNTERS:
+        before = stored.get(field, 0)
+        # Float sums accumulate rounding error, which is not drift
+        tolerance = 1e-6 * max(1.0, abs(actual[field])) if field == "score_sum" else 0
+        if abs(before - actual[field]) > tolerance:
+            drift[field] = (before, actual[field])
+
+    if not dry_run:
+        db[COUNTERS_COLLECTION].update_one({"_id": ALERT_COUNTERS_ID}, {"$set": actual}, upsert=True)
+    return drift
+
+
+async def set_alert_status_many(db, query, status):
+    """
+    Set status on every alert matching query and move the counters to match.
+
+    Runs one update_many per previous status, so each modified count says
+    exactly how many alerts left that status, even while other requests
+    triage the same alerts.
+
+    Args:
+        db: Motor database
+        query: Filter on the anomalies collection (without status)
+        status: New status, one of ALERT_STATUSES
+
+    Returns:
+        tuple: (matched, modified), where matched counts alerts that now have status
+    """
+    collection = write_collection(db, "anomalies", "triage")
+    previous_statuses = [previous for previous in ALERT_STATUSES if previous != status]
+    partitions = [(previous, {**query, "status": previous}) for previous in previous_statuses]
+    # Alerts with a missing or unknown status only add to the new status
+    partitions.append((None, {**query, "status": {"$nin": list(ALERT_STATUSES)}}))
+
+    inc = Counter()
+    modified = 0
+    for previous, partition in partitions:
+        result = await collection.update_many(partition, {"$set": {"status": status}})
+        modified += result.modified_count
+        inc.update(status_move(previous, status, result.modified_count))
+    await increment_alert_counters_async(db, {field: delta for field, delta in inc.items() if delta}, "triage")
+
+    matched = await collection.count_documents({**query, "status": status})
+    return matched, modified
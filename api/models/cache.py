@@ -0,0 +1,91 @@
+"""In-process TTL cache with single-flight computation for expensive API responses."""
+import asyncio
+import time
+
+
+class TTLCache:
+    """
+    Cache computed values for ttl seconds.
+
+    Concurrent misses on the same key share one computation (single-flight):
+    the first caller starts it and the others await the same task, so a burst
+    of dashboard requests after expiry costs one database round instead of
+    one per request. Failed computations are not cached.
+    """
+
+    def __init__(self, ttl):
+        """
+        Args:
+            ttl: Seconds a computed value is served for (0 disables caching)
+        """
+        self.ttl = ttl
+        self._values = {}
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.computations = 0
+        self.compute_time_total = 0.0
+        self.last_compute_time = None
+
+    async def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing it with compute() on a miss.
+
+        Args:
+            key: Cache key
+            compute: Zero-argument coroutine function producing the value
+        """
+        entry = self._values.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, compute))
+            self._inflight[key] = task
+        # Shielded so a client disconnecting does not cancel the shared computation
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, compute):
+        start = time.perf_counter()
+        try:
+            value = await compute()
+            elapsed = time.perf_counter() - start
+            self.computations += 1
+            self.compute_time_total += elapsed
+            self.last_compute_time = elapsed
+            if self.ttl > 0:
+                self._values[key] = (time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when key is None."""
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    def stats(self):
+        """Hit rate and compute timings since startup."""
+        requests = self.hits + self.misses + self.coalesced
+        return {
+            "ttl_seconds": self.ttl,
+            "requests": requests,
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            # Coalesced requests were served without a computation of their own
+            "hit_rate": round((self.hits + self.coalesced) / requests, 4) if requests else 0.0,
+            "computations": self.computations,
+            "avg_compute_ms": round(1000 * self.compute_time_total / self.computations, 2)
+            if self.computations else None,
+            "last_compute_ms": round(1000 * self.last_compute_time, 2)
+            if self.last_compute_time is not None else None,
+        }
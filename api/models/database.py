@@ -1,41 +1,257 @@
 """Database connection and configuration."""
-from pymongo import MongoClient
+from pymongo import MongoClient, monitoring
+from pymongo.read_preferences import Primary, PrimaryPreferred, Secondary, SecondaryPreferred, Nearest
+from pymongo.write_concern import WriteConcern
 from motor.motor_asyncio import AsyncIOMotorClient
+from collections import Counter, deque
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/netsage_ml")
+# Used when MONGO_URI does not name a database
+DEFAULT_DB_NAME = "netsage_ml"
+
+# Client options set from the environment when present (options in MONGO_URI
+# apply otherwise); compressors is a list such as "zstd,snappy,zlib"
+CLIENT_OPTIONS = (
+    ("maxPoolSize", "MONGO_MAX_POOL_SIZE", int),
+    ("minPoolSize", "MONGO_MIN_POOL_SIZE", int),
+    ("maxConnecting", "MONGO_MAX_CONNECTING", int),
+    ("maxIdleTimeMS", "MONGO_MAX_IDLE_TIME_MS", int),
+    ("waitQueueTimeoutMS", "MONGO_WAIT_QUEUE_TIMEOUT_MS", int),
+    ("connectTimeoutMS", "MONGO_CONNECT_TIMEOUT_MS", int),
+    ("serverSelectionTimeoutMS", "MONGO_SERVER_SELECTION_TIMEOUT_MS", int),
+    ("socketTimeoutMS", "MONGO_SOCKET_TIMEOUT_MS", int),
+    ("compressors", "MONGO_COMPRESSORS", str),
+    ("zlibCompressionLevel", "MONGO_ZLIB_COMPRESSION_LEVEL", int),
+)
+
+
+def parse_write_concern(spec):
+    """
+    Parse a write concern such as "w=1,j=false" or "w=majority,wtimeout=5000".
+
+    Returns:
+        WriteConcern
+    """
+    options = {}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        key, _, value = part.partition("=")
+        key, value = key.strip(), value.strip()
+        if key == "w":
+            options["w"] = int(value) if value.isdigit() else value
+        elif key in ("j", "fsync"):
+            options[key] = value.lower() in ("1", "true", "yes")
+        elif key == "wtimeout":
+            options["wtimeout"] = int(value)
+        else:
+            raise ValueError(f"Unknown write concern option: {key}")
+    return WriteConcern(**options)
+
+
+# Write concern per kind of write
+WRITE_CONCERNS = {
+    # Raw flows, rollups and sketches: high volume and rebuildable from Kafka/raw data
+    "bulk": parse_write_concern(os.getenv("MONGO_BULK_WRITE_CONCERN", "w=1,j=false")),
+    # Alerts and alert counters written by the consumers
+    "alerts": parse_write_concern(os.getenv("MONGO_ALERT_WRITE_CONCERN", "w=1")),
+    # Alert status changes made by analysts
+    "triage": parse_write_concern(os.getenv("MONGO_TRIAGE_WRITE_CONCERN", "w=majority")),
+}
+COLLECTION_WRITE_CONCERNS = {
+    "flows": "bulk",
+    "flows_rollup_1m": "bulk",
+    "flows_rollup_1h": "bulk",
+    "top_talkers": "bulk",
+    "anomalies": "alerts",
+    "counters": "alerts",
+}
+
+# Where analytic aggregations (stats, top talkers, exports) read from; they
+# tolerate replication lag, so secondaries take that load off the primary
+ANALYTICS_READ_PREFERENCE = os.getenv("MONGO_ANALYTICS_READ_PREFERENCE", "secondaryPreferred")
+# Skip secondaries lagging more than this (-1: no limit; MongoDB requires at least 90)
+ANALYTICS_MAX_STALENESS_S = int(os.getenv("MONGO_ANALYTICS_MAX_STALENESS_S", "-1"))
+
+READ_PREFERENCES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
 
 # Synchronous client for synchronous operations
 _client = None
+_client_pid = None
 _db = None
 
 # Asynchronous client for async operations
 _async_client = None
 _async_db = None
+_async_analytics_db = None
+
+
+class ConnectionPoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool utilization and checkout wait times of one client.
+
+    Registered as an event listener; wait is the time from asking the pool
+    for a connection to getting one, which grows once the pool is exhausted.
+    """
+
+    def __init__(self, recent=1000):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.max_pool_size = None
+        self.open = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkouts = 0
+        self.failures = Counter()
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.waits = deque(maxlen=recent)
+
+    def connection_check_out_started(self, event):
+        # Checkouts start and finish on the thread running the operation
+        self.local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = time.perf_counter() - getattr(self.local, "started", time.perf_counter())
+        with self.lock:
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.waits.append(wait)
+
+    def connection_check_out_failed(self, event):
+        with self.lock:
+            self.failures[event.reason] += 1
+
+    def connection_checked_in(self, event):
+        with self.lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self.lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self.lock:
+            self.open -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self):
+        """
+        Current utilization and wait times.
+
+        Returns:
+            dict: max_pool_size (per server), open and in_use connections,
+                max_in_use since start, checkouts, checkout_failures by
+                reason, and wait_ms avg/p50/p99 (recent checkouts)/max
+        """
+        with self.lock:
+            waits = sorted(self.waits)
+            checkouts = self.checkouts
+
+            def percentile(q):
+                return 1000 * waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open": self.open,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkouts": checkouts,
+                "checkout_failures": dict(self.failures),
+                "wait_ms": {
+                    "avg": round(1000 * self.wait_total / checkouts, 3) if checkouts else 0.0,
+                    "p50": round(percentile(0.5), 3),
+                    "p99": round(percentile(0.99), 3),
+                    "max": round(1000 * self.wait_max, 3),
+                },
+            }
+
+
+sync_pool_stats = ConnectionPoolStats()
+async_pool_stats = ConnectionPoolStats()
+
+
+def client_options():
+    """Keyword arguments for MongoClient/AsyncIOMotorClient from the MONGO_* settings."""
+    options = {}
+    for option, variable, cast in CLIENT_OPTIONS:
+        value = os.getenv(variable)
+        if value:
+            options[option] = cast(value)
+    return options
+
+
+def analytics_read_preference():
+    """Read preference for analytic aggregations."""
+    mode = READ_PREFERENCES.get(ANALYTICS_READ_PREFERENCE)
+    if mode is None:
+        return Primary()
+    return mode(max_staleness=ANALYTICS_MAX_STALENESS_S)
+
+
+def write_collection(db, name, kind=None):
+    """
+    Collection handle whose writes use the configured write concern.
+
+    Args:
+        db: pymongo or motor database
+        name: Collection name
+        kind: Key of WRITE_CONCERNS; default from COLLECTION_WRITE_CONCERNS
+
+    Returns:
+        Collection (the plain db[name] when no write concern is configured)
+    """
+    kind = kind or COLLECTION_WRITE_CONCERNS.get(name)
+    if kind is None:
+        return db[name]
+    return db.get_collection(name, write_concern=WRITE_CONCERNS[kind])
 
 
 def get_client():
     """Get synchronous MongoDB client."""
-    global _client
-    if _client is None:
-        _client = MongoClient(MONGO_URI)
+    global _client, _client_pid, _db, sync_pool_stats
+    # MongoClient is not fork-safe: forked consumer workers open their own
+    if _client is None or _client_pid != os.getpid():
+        sync_pool_stats = ConnectionPoolStats()
+        _client = MongoClient(MONGO_URI, event_listeners=[sync_pool_stats], **client_options())
+        _client_pid = os.getpid()
+        sync_pool_stats.max_pool_size = _client.options.pool_options.max_pool_size
+        _db = None
     return _client
 
 
 def get_database():
     """Get synchronous database instance."""
     global _db
+    client = get_client()
     if _db is None:
-        client = get_client()
-        # Extract database name from URI or use default
-        if "/" in MONGO_URI.split("mongodb://")[-1]:
-            db_name = MONGO_URI.split("/")[-1].split("?")[0]
-        else:
-            db_name = "netsage_ml"
-        _db = client[db_name]
+        _db = client.get_default_database(DEFAULT_DB_NAME)
     return _db
 
 
@@ -43,7 +259,8 @@ def get_async_client():
     """Get asynchronous MongoDB client."""
     global _async_client
     if _async_client is None:
-        _async_client = AsyncIOMotorClient(MONGO_URI)
+        _async_client = AsyncIOMotorClient(MONGO_URI, event_listeners=[async_pool_stats], **client_options())
+        async_pool_stats.max_pool_size = _async_client.options.pool_options.max_pool_size
     return _async_client
 
 
@@ -51,11 +268,23 @@ def get_async_database():
     """Get asynchronous database instance."""
     global _async_db
     if _async_db is None:
-        client = get_async_client()
-        if "/" in MONGO_URI.split("mongodb://")[-1]:
-            db_name = MONGO_URI.split("/")[-1].split("?")[0]
-        else:
-            db_name = "netsage_ml"
-        _async_db = client[db_name]
+        _async_db = get_async_client().get_default_database(DEFAULT_DB_NAME)
     return _async_db
 
+
+def get_async_analytics_database():
+    """Asynchronous database reading with the analytics read preference."""
+    global _async_analytics_db
+    if _async_analytics_db is None:
+        _async_analytics_db = get_async_database().with_options(read_preference=analytics_read_preference())
+    return _async_analytics_db
+
+
+def pool_stats():
+    """Pool snapshots of the clients opened by this process."""
+    stats = {}
+    if _client is not None and _client_pid == os.getpid():
+        stats["sync"] = sync_pool_stats.snapshot()
+    if _async_client is not None:
+        stats["async"] = async_pool_stats.snapshot()
+    return stats
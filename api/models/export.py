@@ -0,0 +1,196 @@
+"""Streaming NDJSON, CSV, Arrow IPC and Parquet export from MongoDB cursors."""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from api.models.pagination import OLDEST_FIRST
+from pipeline.timestamps import format_timestamp
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Arrow and Parquet exports are optional
+    pa = None
+    pq = None
+
+load_dotenv()
+
+# Documents fetched per cursor round trip, and converted/sent per chunk
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Column name -> Arrow type name, in export order
+FLOW_COLUMNS = {
+    "timestamp": "timestamp", "src_ip": "string", "dst_ip": "string", "protocol": "string",
+    "bytes": "int64", "packets": "int64", "duration": "float64",
+    "src_port": "int64", "dst_port": "int64",
+}
+ALERT_COLUMNS = {
+    "id": "string", "timestamp": "timestamp", "src_ip": "string", "dst_ip": "string",
+    "protocol": "string", "score": "float64", "model": "string", "model_version": "string",
+    "status": "string", "bytes": "int64", "packets": "int64", "duration": "float64",
+}
+FLOW_PROJECTION = {"_id": 0, **{column: 1 for column in FLOW_COLUMNS}}
+ALERT_PROJECTION = {column: 1 for column in ALERT_COLUMNS if column not in ("id", "bytes", "packets", "duration")}
+ALERT_PROJECTION["features"] = 1
+
+
+def flow_row(doc):
+    """Flat row for one flow document."""
+    return {column: doc.get(column) for column in FLOW_COLUMNS}
+
+
+def alert_row(doc):
+    """Flat row for one alert document, with its flow features as columns."""
+    features = doc.get("features") or {}
+    row = {column: doc.get(column) for column in ALERT_COLUMNS}
+    row["id"] = str(doc["_id"])
+    for feature in ("bytes", "packets", "duration"):
+        row[feature] = features.get(feature)
+    return row
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Arrow and Parquet export require the pyarrow package: pip install pyarrow")
+
+
+class _ChunkSink:
+    """Write-only file object collecting what pyarrow writes until it is sent."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _arrow_schema(columns):
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64(),
+             "timestamp": pa.timestamp("ms", tz="UTC")}
+    return pa.schema([(name, types[kind]) for name, kind in columns.items()])
+
+
+def _arrow_column(values, arrow_type):
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+        # Values of the wrong type (e.g. legacy string timestamps) become nulls
+        # instead of aborting a stream that is already half sent
+        column = []
+        for value in values:
+            try:
+                pa.scalar(value, type=arrow_type)
+                column.append(value)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError, OverflowError):
+                column.append(None)
+        return pa.array(column, type=arrow_type)
+
+
+def _record_batch(rows, schema):
+    return pa.RecordBatch.from_arrays(
+        [_arrow_column([row[field.name] for row in rows], field.type) for field in schema],
+        schema=schema
+    )
+
+
+def _text_value(value):
+    return format_timestamp(value) if isinstance(value, datetime) else value
+
+
+async def _batches(collection, query, projection, to_row, batch_size):
+    cursor = collection.find(query, projection).sort(OLDEST_FIRST).batch_size(batch_size)
+    try:
+        rows = []
+        async for doc in cursor:
+            rows.append(to_row(doc))
+            if len(rows) >= batch_size:
+                yield rows
+                rows = []
+        if rows:
+            yield rows
+    finally:
+        # Runs when the client disconnects too, releasing the server-side cursor
+        await cursor.close()
+
+
+async def stream_export(collection, query, projection, columns, to_row, export_format,
+                        batch_size=EXPORT_BATCH_SIZE):
+    """
+    Stream a query as an export file, one cursor batch at a time.
+
+    Only one batch of documents (and its encoded bytes) is held in memory, so
+    memory use does not grow with the size of the export.
+
+    Args:
+        collection: Motor collection
+        query: Filter, as built for the matching listing route
+        projection: Fields to fetch
+        columns: Column name -> Arrow type name, in output order
+        to_row: Converts a document to a dict of columns
+        export_format: One of EXPORT_FORMATS
+        batch_size: Documents per cursor round trip and per output chunk
+
+    Yields:
+        bytes
+    """
+    batches = _batches(collection, query, projection, to_row, batch_size)
+
+    if export_format == "ndjson":
+        async for rows in batches:
+            yield "".join(json.dumps({k: _text_value(v) for k, v in row.items()}) + "\n"
+                          for row in rows).encode()
+
+    elif export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(columns))
+        writer.writeheader()
+        async for rows in batches:
+            writer.writerows({k: _text_value(v) for k, v in row.items()} for row in rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+    else:
+        require_pyarrow()
+        schema = _arrow_schema(columns)
+        sink = _ChunkSink()
+        output = pa.PythonFile(sink, mode="w")
+        if export_format == "arrow":
+            writer = pa.ipc.new_stream(output, schema)
+        else:
+            # Each cursor batch becomes one Parquet row group
+            writer = pq.ParquetWriter(output, schema)
+        async for rows in batches:
+            writer.write_batch(_record_batch(rows, schema))
+            yield sink.take()
+        writer.close()
+        yield sink.take()
@@ -0,0 +1,163 @@
+"""MongoDB index set matched to the API query shapes."""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import PyMongoError
+from api.models.pagination import NEWEST_FIRST, OLDEST_FIRST, after_cursor
+
+# Equality fields come first, then timestamp and _id, so each route's filter
+# and its newest-first sort (or timestamp range, or keyset cursor seek) are
+# served by one index scan that is already in order: no collection scan and
+# no in-memory sort.
+INDEXES = {
+    "flows": [
+        IndexModel(NEWEST_FIRST, name="timestamp_id"),
+        IndexModel([("src_ip", ASCENDING)] + NEWEST_FIRST, name="src_ip_timestamp_id"),
+        IndexModel([("dst_ip", ASCENDING)] + NEWEST_FIRST, name="dst_ip_timestamp_id"),
+        IndexModel([("protocol", ASCENDING)] + NEWEST_FIRST, name="protocol_timestamp_id"),
+    ],
+    "anomalies": [
+        IndexModel(NEWEST_FIRST, name="timestamp_id"),
+        IndexModel([("status", ASCENDING)] + NEWEST_FIRST, name="status_timestamp_id"),
+        IndexModel([("src_ip", ASCENDING)] + NEWEST_FIRST, name="src_ip_timestamp_id"),
+    ],
+    # Heavy-hitter sketch windows: unfolded ones (stale folding, all-time reads) and by hour
+    "top_talkers": [
+        IndexModel([("folded", ASCENDING), ("window", ASCENDING)], name="folded_window"),
+        IndexModel([("window", ASCENDING)], name="window"),
+    ],
+}
+
+# Superseded indexes, dropped by ensure_indexes so writes stop maintaining them
+RETIRED_INDEXES = {
+    "flows": ["timestamp_desc", "src_ip_timestamp", "dst_ip_timestamp", "protocol_timestamp"],
+    "anomalies": ["timestamp_desc", "status_timestamp"],
+}
+
+# Stages that mean a query is not fully served by an index
+BAD_STAGES = {"COLLSCAN", "SORT"}
+
+
+def ensure_indexes(db):
+    """
+    Create any missing indexes (existing ones are left untouched).
+
+    Failures are reported rather than raised, so the API and consumer still
+    start when MongoDB is briefly unavailable or an index conflicts.
+
+    Args:
+        db: Synchronous pymongo database
+
+    Returns:
+        bool: True if every index is in place
+    """
+    ok = True
+    for collection, indexes in INDEXES.items():
+        try:
+            db[collection].create_indexes(indexes)
+            existing = db[collection].index_information()
+            for name in RETIRED_INDEXES.get(collection, []):
+                if name in existing:
+                    db[collection].drop_index(name)
+        except PyMongoError as e:
+            print(f"⚠️  Could not ensure indexes on {collection}: {e}")
+            ok = False
+    return ok
+
+
+async def ensure_indexes_async(db):
+    """ensure_indexes for a motor database."""
+    ok = True
+    for collection, indexes in INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+            existing = await db[collection].index_information()
+            for name in RETIRED_INDEXES.get(collection, []):
+                if name in existing:
+                    await db[collection].drop_index(name)
+        except PyMongoError as e:
+            print(f"⚠️  Could not ensure indexes on {collection}: {e}")
+            ok = False
+    return ok
+
+
+def query_shapes():
+    """
+    The filters and sorts issued by the API routes, with sample values.
+
+    Aggregations are listed by their leading $match, which is the part the
+    query planner answers with an index.
+
+    Returns:
+        list: (description, collection, filter, sort) tuples
+    """
+    recent = {"$gte": datetime.utcnow() - timedelta(hours=24)}
+    # A page boundary somewhere in the recent window
+    cursor = (datetime.utcnow() - timedelta(hours=1), ObjectId())
+    return [
+        ("GET /api/flows", "flows", {}, NEWEST_FIRST),
+        ("GET /api/flows?hours", "flows", {"timestamp": recent}, NEWEST_FIRST),
+        ("GET /api/flows?src_ip", "flows", {"src_ip": "10.10.0.1"}, NEWEST_FIRST),
+        ("GET /api/flows?src_ip&hours", "flows", {"src_ip": "10.10.0.1", "timestamp": recent}, NEWEST_FIRST),
+        ("GET /api/flows?dst_ip", "flows", {"dst_ip": "10.20.0.1"}, NEWEST_FIRST),
+        ("GET /api/flows?protocol&hours", "flows", {"protocol": "TCP", "timestamp": recent}, NEWEST_FIRST),
+        ("GET /api/flows?src_ip&dst_ip&protocol", "flows",
+         {"src_ip": "10.10.0.1", "dst_ip": "10.20.0.1", "protocol": "TCP"}, NEWEST_FIRST),
+        ("GET /api/flows?cursor", "flows", after_cursor({}, cursor), NEWEST_FIRST),
+        ("GET /api/flows?src_ip&hours&cursor", "flows",
+         after_cursor({"src_ip": "10.10.0.1", "timestamp": recent}, cursor), NEWEST_FIRST),
+        ("GET /api/export/flows", "flows", {}, OLDEST_FIRST),
+        ("GET /api/export/flows?src_ip&hours", "flows", {"src_ip": "10.10.0.1", "timestamp": recent}, OLDEST_FIRST),
+        ("GET /api/flows/stats/summary (recent_24h)", "flows", {"timestamp": recent}, None),
+        ("GET /api/stats/time-series (flows $match)", "flows", {"timestamp": recent}, None),
+        ("GET /api/alerts", "anomalies", {}, NEWEST_FIRST),
+        ("GET /api/alerts?status", "anomalies", {"status": "new"}, NEWEST_FIRST),
+        ("GET /api/alerts?hours", "anomalies", {"timestamp": recent}, NEWEST_FIRST),
+        ("GET /api/alerts?status&hours", "anomalies", {"status": "new", "timestamp": recent}, NEWEST_FIRST),
+        ("GET /api/alerts?cursor", "anomalies", after_cursor({}, cursor), NEWEST_FIRST),
+        ("GET /api/alerts?status&cursor", "anomalies", after_cursor({"status": "new"}, cursor), NEWEST_FIRST),
+        ("GET /api/export/alerts?status&hours", "anomalies", {"status": "new", "timestamp": recent}, OLDEST_FIRST),
+        ("GET /api/stats/time-series (anomalies $match)", "anomalies", {"timestamp": recent}, None),
+        ("PATCH /api/alerts/status/filter (src_ip)", "anomalies", {"src_ip": "10.10.0.25", "status": "new"}, None),
+        ("PATCH /api/alerts/status/filter (src_ip, time range)", "anomalies",
+         {"src_ip": "10.10.0.25", "timestamp": recent, "status": "new"}, None),
+    ]
+
+
+def _plan_stages(plan):
+    """Yield (stage, index name) for every node of a winning plan tree."""
+    if not plan:
+        return
+    yield plan.get("stage"), plan.get("indexName")
+    for key in ("inputStage", "outerStage", "innerStage"):
+        yield from _plan_stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def explain_query_shapes(db):
+    """
+    Explain every route query shape.
+
+    Returns:
+        list: Dicts with description, collection, stages, indexes and ok
+    """
+    results = []
+    for description, collection, query, sort in query_shapes():
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        # Slot-based engine plans nest the classic tree under queryPlan
+        winning_plan = winning_plan.get("queryPlan", winning_plan)
+
+        stages = list(_plan_stages(winning_plan))
+        stage_names = [stage for stage, _ in stages]
+        results.append({
+            "description": description,
+            "collection": collection,
+            "stages": stage_names,
+            "indexes": sorted({index for _, index in stages if index}),
+            "ok": not BAD_STAGES.intersection(stage_names)
+        })
+    return results
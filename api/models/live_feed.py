@@ -0,0 +1,261 @@
+"""Server-push feed of new alerts and stats deltas for the dashboard."""
+import asyncio
+import json
+import os
+from collections import deque
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+from dotenv import load_dotenv
+from api.models.Alert import Alert
+from api.models.alert_counters import read_alert_counters
+from api.models.rollups import ROLLUP_COLLECTIONS, bucket_start, rollup_totals
+
+load_dotenv()
+
+# auto = change stream when MongoDB supports it (replica set), else poll
+LIVE_FEED_SOURCE = os.getenv("LIVE_FEED_SOURCE", "auto")
+LIVE_POLL_INTERVAL_S = float(os.getenv("LIVE_POLL_INTERVAL_S", 1))
+LIVE_STATS_INTERVAL_S = float(os.getenv("LIVE_STATS_INTERVAL_S", 2))
+LIVE_MAX_PENDING_ALERTS = int(os.getenv("LIVE_MAX_PENDING_ALERTS", 500))
+HEARTBEAT_INTERVAL_S = 15
+
+# Polling re-reads this far back: ObjectIds from different consumers are only
+# ordered to the second, so a later insert can carry a smaller _id
+POLL_LOOKBACK_S = 5
+
+
+def serialize_alert(doc):
+    """Alert document as the JSON dict the REST listing returns (None if invalid)."""
+    doc = dict(doc)
+    doc["id"] = str(doc.pop("_id"))
+    try:
+        return Alert(**doc).model_dump(mode="json")
+    except ValueError:
+        return None
+
+
+def format_event(event, data):
+    """One server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+class Subscriber:
+    """
+    Pending events for one connected client.
+
+    The feed never waits on a client. Alerts queue up to max_pending; past
+    that the queue is dropped and the client is told to resync (reload its
+    first page), which is cheaper than replaying a backlog. Stats are
+    coalesced: only the latest value of each field is kept until sent.
+    """
+
+    def __init__(self, max_pending, stats):
+        self.max_pending = max_pending
+        self.alerts = deque()
+        self.stats = dict(stats)
+        self.overflowed = False
+        self.wake = asyncio.Event()
+        if self.stats:
+            self.wake.set()
+
+    def push_alerts(self, alerts):
+        if not self.overflowed:
+            if len(self.alerts) + len(alerts) > self.max_pending:
+                self.overflowed = True
+                self.alerts.clear()
+            else:
+                self.alerts.extend(alerts)
+        self.wake.set()
+
+    def push_stats(self, delta):
+        self.stats.update(delta)
+        self.wake.set()
+
+    def drain(self):
+        """Take everything pending as (event, data) pairs."""
+        self.wake.clear()
+        events = []
+        if self.overflowed:
+            events.append(("resync", {}))
+            self.overflowed = False
+        if self.alerts:
+            events.append(("alerts", list(self.alerts)))
+            self.alerts.clear()
+        if self.stats:
+            events.append(("stats", self.stats))
+            self.stats = {}
+        return events
+
+
+class LiveFeed:
+    """
+    Fans new alerts and stats changes out to every subscribed client.
+
+    One background task follows the anomalies collection, through a change
+    stream when MongoDB is a replica set and otherwise by polling for recent
+    _ids. Another re-reads the alert counters and recent hour rollups every
+    LIVE_STATS_INTERVAL_S. Both are shared by all clients, so database load
+    does not grow with the number of open dashboards.
+    """
+
+    def __init__(self, source=LIVE_FEED_SOURCE, poll_interval=LIVE_POLL_INTERVAL_S,
+                 stats_interval=LIVE_STATS_INTERVAL_S, max_pending=LIVE_MAX_PENDING_ALERTS):
+        self.source = source
+        self.poll_interval = poll_interval
+        self.stats_interval = stats_interval
+        self.max_pending = max_pending
+        self.subscribers = set()
+        self.snapshot = {}
+        self._tasks = []
+        # Flows in hour rollups that no longer receive writes, and the hour they end at
+        self._settled_flows = 0
+        self._settled_until = None
+
+    def subscribe(self):
+        """Register a client; it starts with the latest full stats snapshot."""
+        subscriber = Subscriber(self.max_pending, self.snapshot)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish_alerts(self, docs):
+        alerts = [alert for alert in map(serialize_alert, docs) if alert is not None]
+        if not alerts:
+            return
+        for subscriber in self.subscribers:
+            subscriber.push_alerts(alerts)
+
+    def publish_stats(self, snapshot):
+        """Send the fields of snapshot that changed since the previous one."""
+        delta = {field: value for field, value in snapshot.items() if self.snapshot.get(field) != value}
+        self.snapshot = snapshot
+        if delta:
+            for subscriber in self.subscribers:
+                subscriber.push_stats(delta)
+
+    async def events(self, is_disconnected):
+        """
+        Server-sent event stream for one client.
+
+        Args:
+            is_disconnected: Coroutine function reporting whether the client went away
+        """
+        subscriber = self.subscribe()
+        try:
+            yield "retry: 3000\n\n"
+            while not await is_disconnected():
+                try:
+                    await asyncio.wait_for(subscriber.wake.wait(), HEARTBEAT_INTERVAL_S)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream
+                    yield ": heartbeat\n\n"
+                    continue
+                for event, data in subscriber.drain():
+                    yield format_event(event, data)
+        finally:
+            self.unsubscribe(subscriber)
+
+    def start(self, db):
+        """Start the background tasks on the running event loop."""
+        self._tasks = [
+            asyncio.create_task(self._follow_alerts(db["anomalies"])),
+            asyncio.create_task(self._follow_stats(db)),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _follow_alerts(self, collection):
+        use_change_stream = self.source != "poll"
+        while True:
+            try:
+                if use_change_stream:
+                    await self._watch_inserts(collection)
+                else:
+                    await self._poll_inserts(collection)
+            except OperationFailure as e:
+                if use_change_stream and self.source == "auto":
+                    # Standalone servers reject $changeStream
+                    print(f"⚠️  Change streams unavailable ({e}); polling anomalies "
+                          f"every {self.poll_interval}s for the live feed")
+                    use_change_stream = False
+                    continue
+                print(f"⚠️  Live feed lost the anomalies collection: {e}")
+                await asyncio.sleep(self.poll_interval)
+            except PyMongoError as e:
+                print(f"⚠️  Live feed lost the anomalies collection: {e}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _watch_inserts(self, collection):
+        async with collection.watch([{"$match": {"operationType": "insert"}}]) as stream:
+            print("📡 Live feed following anomalies through a change stream")
+            async for change in stream:
+                if self.subscribers:
+                    self.publish_alerts([change["fullDocument"]])
+
+    async def _poll_inserts(self, collection):
+        # _id -> creation time of alerts already published inside the lookback window
+        seen = {}
+        since = datetime.utcnow()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            now = datetime.utcnow()
+            if not self.subscribers:
+                seen.clear()
+                since = now
+                continue
+
+            floor = ObjectId.from_datetime(since - timedelta(seconds=POLL_LOOKBACK_S))
+            # Ids alone are answered from the _id index; full documents are
+            # only fetched for alerts not published yet
+            ids = [doc["_id"] for doc in
+                   await collection.find({"_id": {"$gte": floor}}, {"_id": 1}).to_list(length=None)]
+            fresh = [_id for _id in ids if _id not in seen]
+            if fresh:
+                docs = await collection.find({"_id": {"$in": fresh}}).sort("_id", 1).to_list(length=None)
+                self.publish_alerts(docs)
+                for _id in fresh:
+                    seen[_id] = _id.generation_time.replace(tzinfo=None)
+
+            since = now
+            cutoff = since - timedelta(seconds=POLL_LOOKBACK_S + 1)
+            seen = {_id: created for _id, created in seen.items() if created >= cutoff}
+
+    async def _follow_stats(self, db):
+        while True:
+            if self.subscribers:
+                try:
+                    self.publish_stats(await self._read_stats(db))
+                except PyMongoError as e:
+                    print(f"⚠️  Live feed could not read stats: {e}")
+            await asyncio.sleep(self.stats_interval)
+
+    async def _read_stats(self, db):
+        """Alert counters plus total flows, using a few point reads."""
+        hours = db[ROLLUP_COLLECTIONS["hour"]]
+        # The current and previous hour can still receive (late) increments;
+        # everything before them is summed once per hour
+        open_from = bucket_start(datetime.utcnow(), "hour") - timedelta(hours=1)
+        if self._settled_until != open_from:
+            self._settled_flows = (await rollup_totals(db, before=open_from))["flows"]
+            self._settled_until = open_from
+
+        counters, recent = await asyncio.gather(
+            read_alert_counters(db),
+            hours.find({"_id": {"$gte": open_from}}, {"flows": 1}).to_list(length=None)
+        )
+        avg_score = counters["score_sum"] / counters["score_n"] if counters["score_n"] else 0.0
+        return {
+            "total": counters["total"],
+            "new": counters["new"],
+            "acknowledged": counters["acknowledged"],
+            "resolved": counters["resolved"],
+            "avg_score": round(avg_score, 4),
+            "total_flows": self._settled_flows + sum(doc.get("flows", 0) for doc in recent),
+        }
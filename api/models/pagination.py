@@ -0,0 +1,96 @@
+"""Opaque keyset cursors for newest-first listings."""
+import base64
+import json
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+# Listings sort on (timestamp, _id) so that the order is total and a page
+# boundary can be resumed exactly, even when many documents share a timestamp
+NEWEST_FIRST = [("timestamp", DESCENDING), ("_id", DESCENDING)]
+# Exports run in time order; the same indexes serve it scanned backwards
+OLDEST_FIRST = [("timestamp", ASCENDING), ("_id", ASCENDING)]
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def encode_cursor(doc):
+    """Cursor pointing just past doc, the last document of a page."""
+    timestamp = doc.get("timestamp")
+    if isinstance(timestamp, datetime):
+        # BSON dates have millisecond precision, so this round-trips exactly
+        key = {"t": (timestamp.replace(tzinfo=None) - _EPOCH) // timedelta(milliseconds=1)}
+    else:
+        # Documents not yet converted by scripts/migrate_timestamps.py
+        key = {"s": timestamp}
+    key["id"] = str(doc["_id"])
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """
+    Decode a cursor into (timestamp, _id).
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        timestamp = _EPOCH + timedelta(milliseconds=key["t"]) if "t" in key else key["s"]
+        return timestamp, ObjectId(key["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def after_cursor(query, cursor):
+    """
+    Restrict a listing query to documents after the cursor in NEWEST_FIRST order.
+
+    Each $or branch repeats the route's filters, so both are answered by an
+    index seek on (filter fields, timestamp, _id) and merged in sort order
+    instead of walking past earlier pages.
+    """
+    timestamp, last_id = cursor
+    timestamp_filter = query.get("timestamp", {})
+    branches = [
+        {**query, "timestamp": {**timestamp_filter, "$lt": timestamp}},
+        {**query, "timestamp": {**timestamp_filter, "$eq": timestamp}, "_id": {"$lt": last_id}},
+    ]
+    if isinstance(timestamp, datetime) and not timestamp_filter:
+        # $lt on a date only matches dates, but unmigrated string timestamps
+        # sort after every date in newest-first order
+        branches.append({**query, "timestamp": {"$type": "string"}})
+    return {"$or": branches}
+
+
+async def fetch_page(collection, query, limit, cursor=None, offset=0, projection=None):
+    """
+    Fetch one newest-first page from a motor collection.
+
+    Args:
+        collection: Motor collection
+        query: Route filter
+        limit: Page size
+        cursor: Token from the previous page's X-Next-Cursor header
+        offset: Deprecated skip-based paging, only used without a cursor
+        projection: Fields to fetch (timestamp and _id are needed for the cursor)
+
+    Returns:
+        tuple: (documents, next cursor or None when this is the last page)
+
+    Raises:
+        ValueError: If both cursor and offset are given or the cursor is malformed
+    """
+    if cursor:
+        if offset:
+            raise ValueError("Use either cursor or offset, not both")
+        query = after_cursor(query, decode_cursor(cursor))
+
+    find = collection.find(query, projection).sort(NEWEST_FIRST)
+    if offset:
+        find = find.skip(offset)
+    docs = await find.limit(limit).to_list(length=limit)
+
+    next_cursor = encode_cursor(docs[-1]) if len(docs) == limit else None
+    return docs, next_cursor
@@ -0,0 +1,44 @@
+"""ASGI middleware recording API latency per route template."""
+import time
+from pipeline.metrics import REQUEST_SECONDS
+
+
+class RequestMetricsMiddleware:
+    """
+    Observe each request in REQUEST_SECONDS when its response starts.
+
+    Routes are labelled by their template (/api/alerts/{alert_id}), so IDs do
+    not create new series. Streaming responses (SSE, exports) are measured
+    to their first byte rather than for as long as they stay open.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        observed = False
+
+        def observe(status):
+            nonlocal observed
+            observed = True
+            # FastAPI stores the matched route in the scope while routing
+            route = scope.get("route")
+            REQUEST_SECONDS.labels(scope["method"], getattr(route, "path", "unmatched"), str(status)).observe(
+                time.perf_counter() - start)
+
+        async def send_and_observe(message):
+            if message["type"] == "http.response.start" and not observed:
+                observe(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_observe)
+        except Exception:
+            if not observed:
+                observe(500)
+            raise
@@ -0,0 +1,35 @@
+"""JSON response class for endpoints that return raw MongoDB documents."""
+import json
+from datetime import datetime
+from fastapi.responses import JSONResponse
+from pipeline.timestamps import format_timestamp
+
+try:
+    import orjson
+except ImportError:  # falls back to the standard library encoder
+    orjson = None
+
+# Naive datetimes are UTC (as pymongo returns them) and end in 'Z', matching
+# format_timestamp and the Pydantic models' serializers
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z if orjson else 0
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return format_timestamp(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Serialize content with orjson when it is installed.
+
+    Route handlers return this directly with plain dicts, which skips
+    FastAPI's response_model validation and serialization pass, so the
+    handler is responsible for returning only the documented fields.
+    """
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content, option=ORJSON_OPTIONS)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
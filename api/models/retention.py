@@ -0,0 +1,136 @@
+"""Tiered retention: expire raw flows and minute rollups, downsample hour rollups into days."""
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from api.models.rollups import (
+    COUNTERS, ROLLUP_COLLECTIONS, DAY_ROLLUP_COLLECTION, bucket_start, retention_cutoffs
+)
+from api.models.top_talkers import TALKERS_COLLECTION
+
+# Tiers, finest first. Every flow is counted in the minute and hour rollups
+# when it is written, so expiring raw flows and minute rollups loses no
+# totals; hour rollups are folded into day rollups before they are deleted.
+#   flows             FLOW_RETENTION_HOURS
+#   flows_rollup_1m   MINUTE_ROLLUP_RETENTION_HOURS
+#   flows_rollup_1h   HOUR_ROLLUP_RETENTION_DAYS (whole days)
+#   flows_rollup_1d   forever
+
+
+def expire_flows(db, before, dry_run=False):
+    """
+    Delete raw flows with timestamp < before, one hour of timestamps per delete.
+
+    Each delete is a bounded range on the timestamp index, so no single
+    operation holds the collection for long; gaps are skipped by seeking
+    to the oldest remaining flow.
+
+    Returns:
+        int: Flows deleted (or that would be deleted)
+    """
+    flows = db["flows"]
+    if dry_run:
+        return flows.count_documents({"timestamp": {"$lt": before}})
+
+    deleted = 0
+    while True:
+        oldest = flows.find_one({"timestamp": {"$lt": before}}, {"timestamp": 1}, sort=[("timestamp", 1)])
+        if oldest is None:
+            return deleted
+        end = min(bucket_start(oldest["timestamp"], "hour") + timedelta(hours=1), before)
+        deleted += flows.delete_many({"timestamp": {"$lt": end}}).deleted_count
+
+
+def expire_minute_rollups(db, before, dry_run=False):
+    """
+    Delete minute rollups before a time; the hour rollups already hold their counts.
+
+    Returns:
+        int: Buckets deleted (or that would be deleted)
+    """
+    collection = db[ROLLUP_COLLECTIONS["minute"]]
+    query = {"_id": {"$lt": before}}
+    if dry_run:
+        return collection.count_documents(query)
+    return collection.delete_many(query).deleted_count
+
+
+def _day_increments(doc):
+    inc = {field: doc.get(field, 0) for field in COUNTERS}
+    inc.update({f"protocols.{protocol}": count for protocol, count in doc.get("protocols", {}).items()})
+    return inc
+
+
+def downsample_hour_rollups(db, before, dry_run=False):
+    """
+    Fold the hour rollups of every whole day before a time into day rollups.
+
+    Each hour is added to its day only if the day does not list it yet, and
+    deleted afterwards, so an interrupted run is safe to repeat: an hour
+    that was folded but not deleted is skipped by readers and deleted next
+    time. Increments a consumer writes to an hour older than the retention
+    between the fold and the delete are lost.
+
+    Returns:
+        int: Hours folded (or that would be folded)
+    """
+    hours = db[ROLLUP_COLLECTIONS["hour"]]
+    days = db[DAY_ROLLUP_COLLECTION]
+    query = {"_id": {"$lt": bucket_start(before, "day")}}
+    if dry_run:
+        return hours.count_documents(query)
+
+    folded = 0
+    for doc in hours.find(query).sort("_id", 1):
+        hour = doc["_id"]
+        try:
+            days.update_one(
+                {"_id": bucket_start(hour, "day"), "hours": {"$ne": hour}},
+                {"$inc": _day_increments(doc), "$push": {"hours": hour}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Already folded by a run that stopped before deleting it
+            pass
+        hours.delete_one({"_id": hour})
+        folded += 1
+    return folded
+
+
+def expire_talker_windows(db, before, dry_run=False):
+    """
+    Delete hourly top talkers windows before a time that are already in the all-time sketch.
+
+    Returns:
+        int: Window documents deleted (or that would be deleted)
+    """
+    collection = db[TALKERS_COLLECTION]
+    query = {"folded": True, "window": {"$lt": before}}
+    if dry_run:
+        return collection.count_documents(query)
+    return collection.delete_many(query).deleted_count
+
+
+def apply_retention(db, now=None, dry_run=False):
+    """
+    Run every retention step for the configured windows.
+
+    Tiers kept forever (a window of 0) are skipped. Safe to run from
+    several places at once: every step is idempotent.
+
+    Args:
+        db: Synchronous pymongo database
+        now: Reference time (default: now, UTC)
+        dry_run: Only count what would be removed
+
+    Returns:
+        dict: step -> documents affected
+    """
+    cutoffs = retention_cutoffs(now or datetime.utcnow())
+    report = {}
+    if cutoffs["flows"] is not None:
+        report["flows expired"] = expire_flows(db, cutoffs["flows"], dry_run)
+    if cutoffs["minute"] is not None:
+        report["minute rollups expired"] = expire_minute_rollups(db, cutoffs["minute"], dry_run)
+    if cutoffs["hour"] is not None:
+        report["hour rollups downsampled"] = downsample_hour_rollups(db, cutoffs["hour"], dry_run)
+        report["top talkers windows expired"] = expire_talker_windows(db, cutoffs["hour"], dry_run)
+    return report
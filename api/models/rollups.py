@@ -0,0 +1,357 @@
+"""Per-minute, per-hour and per-day rollups of flows and anomalies for the stats routes."""
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from api.models.database import write_collection
+
+load_dotenv()
+
+# One document per bucket, keyed by the bucket's start time
+ROLLUP_COLLECTIONS = {"minute": "flows_rollup_1m", "hour": "flows_rollup_1h"}
+# Whole days of hour rollups, downsampled by the retention job (not written by consumers);
+# each day lists the hours folded into it
+DAY_ROLLUP_COLLECTION = "flows_rollup_1d"
+
+# How long each tier is kept by scripts/apply_retention.py (0 keeps it forever);
+# older spans are answered from the next coarser tier
+FLOW_RETENTION_HOURS = float(os.getenv("FLOW_RETENTION_HOURS", "168"))
+MINUTE_ROLLUP_RETENTION_HOURS = float(os.getenv("MINUTE_ROLLUP_RETENTION_HOURS", "168"))
+HOUR_ROLLUP_RETENTION_DAYS = float(os.getenv("HOUR_ROLLUP_RETENTION_DAYS", "90"))
+
+# Sums only include numeric values and *_n counts them, mirroring how $avg
+# skips missing and non-numeric fields in the full-scan aggregations
+SUMMED_FIELDS = ("bytes", "packets", "duration")
+COUNTERS = ("flows", "anomalies", "score_sum", "score_n") + \
+    tuple(f"{field}_{suffix}" for field in SUMMED_FIELDS for suffix in ("sum", "n"))
+
+
+def bucket_start(timestamp, unit):
+    """Start of the minute, hour or day containing timestamp."""
+    if unit == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(second=0, microsecond=0)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def retention_cutoffs(now=None):
+    """
+    Where each tier's retention currently ends.
+
+    Returns:
+        dict: "flows", "minute" and "hour" -> datetime before which that tier
+            may have been deleted, or None when it is kept forever
+    """
+    now = now or datetime.utcnow()
+    windows = {
+        "flows": timedelta(hours=FLOW_RETENTION_HOURS),
+        "minute": timedelta(hours=MINUTE_ROLLUP_RETENTION_HOURS),
+        "hour": timedelta(days=HOUR_ROLLUP_RETENTION_DAYS),
+    }
+    return {tier: (now - window if window else None) for tier, window in windows.items()}
+
+
+def readable_start(start, now=None):
+    """
+    Round start down to the finest tier still kept for it.
+
+    A window reaching past the raw flows starts on a whole minute, past the
+    minute rollups on a whole hour and past the hour rollups on a whole day.
+    """
+    cutoffs = retention_cutoffs(now)
+    for tier, unit in (("flows", "minute"), ("minute", "hour"), ("hour", "day")):
+        if cutoffs[tier] is not None and start < cutoffs[tier]:
+            start = bucket_start(start, unit)
+    return start
+
+
+def protocol_key(protocol):
+    """Field name for a protocol inside the protocols sub-document."""
+    if not isinstance(protocol, str) or not protocol or "." in protocol or protocol.startswith("$"):
+        return "other"
+    return protocol
+
+
+def rollup_increments(flow_docs, alerts, unit):
+    """
+    Aggregate a batch into per-bucket $inc documents.
+
+    Returns:
+        dict: bucket start -> {field: increment}
+    """
+    buckets = defaultdict(lambda: defaultdict(int))
+    for doc in flow_docs:
+        timestamp = doc.get("timestamp")
+        if not isinstance(timestamp, datetime):
+            continue
+        inc = buckets[bucket_start(timestamp, unit)]
+        inc["flows"] += 1
+        inc[f"protocols.{protocol_key(doc.get('protocol'))}"] += 1
+        for field in SUMMED_FIELDS:
+            value = doc.get(field)
+            if _is_number(value):
+                inc[f"{field}_sum"] += value
+                inc[f"{field}_n"] += 1
+
+    for alert in alerts:
+        timestamp = alert.get("timestamp")
+        if not isinstance(timestamp, datetime):
+            continue
+        inc = buckets[bucket_start(timestamp, unit)]
+        inc["anomalies"] += 1
+        if _is_number(alert.get("score")):
+            inc["score_sum"] += alert["score"]
+            inc["score_n"] += 1
+    return buckets
+
+
+def rollup_requests(flow_docs, alerts):
+    """
+    Upserts applying one batch to both rollup granularities.
+
+    A batch usually spans one or two minutes, so this is a handful of
+    updates per batch rather than one per flow.
+
+    Returns:
+        dict: collection name -> list of UpdateOne
+    """
+    return {
+        collection: [UpdateOne({"_id": start}, {"$inc": dict(inc)}, upsert=True)
+                     for start, inc in rollup_increments(flow_docs, alerts, unit).items()]
+        for unit, collection in ROLLUP_COLLECTIONS.items()
+    }
+
+
+def write_rollups(db, flow_docs, alerts):
+    """Apply a written batch to the rollups (synchronous pymongo)."""
+    for collection, requests in rollup_requests(flow_docs, alerts).items():
+        if requests:
+            write_collection(db, collection).bulk_write(requests, ordered=False)
+
+
+async def write_rollups_async(db, flow_docs, alerts):
+    """Apply a written batch to the rollups (motor)."""
+    for collection, requests in rollup_requests(flow_docs, alerts).items():
+        if requests:
+            await write_collection(db, collection).bulk_write(requests, ordered=False)
+
+
+def _numeric_sum(field):
+    return {"$sum": {"$cond": [{"$isNumber": f"${field}"}, f"${field}", 0]}}
+
+
+def _numeric_count(field):
+    return {"$sum": {"$cond": [{"$isNumber": f"${field}"}, 1, 0]}}
+
+
+def raw_rollup_pipelines(unit, match=None):
+    """
+    Pipelines computing rollup documents straight from the raw collections.
+
+    Used by the rebuild command and to cover the part of a time window that
+    starts mid-minute.
+
+    Returns:
+        tuple: (flows pipeline, anomalies pipeline), each yielding rollup-shaped documents
+    """
+    match_stage = [{"$match": match}] if match else []
+    bucket = {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+    flow_fields = {f"{field}_{suffix}": {"$sum": f"${field}_{suffix}"}
+                   for field in SUMMED_FIELDS for suffix in ("sum", "n")}
+
+    flows_pipeline = match_stage + [
+        {"$match": {"timestamp": {"$type": "date"}}},
+        {"$group": {
+            "_id": {"bucket": bucket, "protocol": "$protocol"},
+            "flows": {"$sum": 1},
+            **{f"{field}_sum": _numeric_sum(field) for field in SUMMED_FIELDS},
+            **{f"{field}_n": _numeric_count(field) for field in SUMMED_FIELDS}
+        }},
+        {"$group": {
+            "_id": "$_id.bucket",
+            "flows": {"$sum": "$flows"},
+            **flow_fields,
+            "protocols": {"$push": {"k": "$_id.protocol", "v": "$flows"}}
+        }}
+    ]
+    anomalies_pipeline = match_stage + [
+        {"$match": {"timestamp": {"$type": "date"}}},
+        {"$group": {
+            "_id": bucket,
+            "anomalies": {"$sum": 1},
+            "score_sum": _numeric_sum("score"),
+            "score_n": _numeric_count("score")
+        }}
+    ]
+    return flows_pipeline, anomalies_pipeline
+
+
+def protocols_to_dict(pairs):
+    """Fold the pushed {k, v} protocol pairs of a raw pipeline into rollup keys."""
+    protocols = defaultdict(int)
+    for pair in pairs:
+        protocols[protocol_key(pair.get("k"))] += pair["v"]
+    return dict(protocols)
+
+
+def _empty_bucket():
+    return dict.fromkeys(COUNTERS, 0) | {"protocols": defaultdict(int)}
+
+
+def _add(bucket, doc):
+    for field in COUNTERS:
+        bucket[field] += doc.get(field, 0)
+    protocols = doc.get("protocols", {})
+    if isinstance(protocols, list):
+        protocols = protocols_to_dict(protocols)
+    for protocol, count in protocols.items():
+        bucket["protocols"][protocol] += count
+
+
+async def _day_rollups(db, query):
+    """Day rollup documents matching query, and the set of hours folded into them."""
+    days, folded = [], set()
+    async for doc in db[DAY_ROLLUP_COLLECTION].find(query):
+        days.append(doc)
+        folded.update(doc.get("hours", []))
+    return days, folded
+
+
+async def hourly_buckets(db, start):
+    """
+    Hourly totals for every flow and anomaly with timestamp >= start.
+
+    start is first rounded by readable_start. The window is then stitched
+    from exact sources, so it equals a full scan of the raw collections as
+    they were before retention:
+        [start, next minute)       raw flows and anomalies (at most a minute)
+        [next minute, next hour)   minute rollups
+        [next hour, ...)           hour rollups, plus day rollups for the
+                                   hours already downsampled
+
+    Returns:
+        dict: hour start (day start for downsampled days) -> bucket of
+            COUNTERS plus protocols
+    """
+    start = readable_start(start)
+    minute = bucket_start(start, "minute")
+    minute = minute if minute == start else minute + timedelta(minutes=1)
+    hour = bucket_start(start, "hour")
+    hour = hour if hour == start else hour + timedelta(hours=1)
+
+    buckets = defaultdict(_empty_bucket)
+    if start < minute:
+        flows_pipeline, anomalies_pipeline = raw_rollup_pipelines(
+            "hour", {"timestamp": {"$gte": start, "$lt": minute}})
+        for collection, pipeline in (("flows", flows_pipeline), ("anomalies", anomalies_pipeline)):
+            async for doc in db[collection].aggregate(pipeline):
+                _add(buckets[doc["_id"]], doc)
+
+    async for doc in db[ROLLUP_COLLECTIONS["minute"]].find({"_id": {"$gte": minute, "$lt": hour}}):
+        _add(buckets[bucket_start(doc["_id"], "hour")], doc)
+    days, folded = await _day_rollups(db, {"_id": {"$gte": hour}})
+    for doc in days:
+        _add(buckets[doc["_id"]], doc)
+    async for doc in db[ROLLUP_COLLECTIONS["hour"]].find({"_id": {"$gte": hour}}):
+        # Hours folded into a day but not deleted yet are counted by the day
+        if doc["_id"] not in folded:
+            _add(buckets[doc["_id"]], doc)
+    return buckets
+
+
+async def rollup_totals(db, before=None):
+    """
+    Totals over all time (or before a given hour) from the day and hour rollups.
+
+    Args:
+        db: Motor database
+        before: Only buckets starting before this hour; None for everything
+    """
+    query = {"_id": {"$lt": before}} if before else {}
+    total = _empty_bucket()
+    days, folded = await _day_rollups(db, query)
+    for doc in days:
+        _add(total, doc)
+    async for doc in db[ROLLUP_COLLECTIONS["hour"]].find(query):
+        if doc["_id"] not in folded:
+            _add(total, doc)
+    return total
+
+
+def average(bucket, field):
+    """Mean of a summed field in a bucket (0.0 when it had no numeric values)."""
+    n = bucket[f"{field}_n"]
+    return bucket[f"{field}_sum"] / n if n else 0.0
+
+
+def rebuild_rollups(db, batch_size=5000, keep_before=None):
+    """
+    Regenerate the minute and hour rollups from the raw collections.
+
+    Each rollup is rebuilt into a scratch collection that then replaces the
+    live one in a single rename. Increments written by a running consumer
+    between the scan and the rename are lost, so rebuild with the consumers
+    stopped (or rebuild again afterwards).
+
+    Args:
+        db: Synchronous pymongo database
+        batch_size: Documents per insert
+        keep_before: Keep the live buckets before this time instead of
+            recomputing them, for when raw flows before it were expired;
+            None rebuilds everything. Day rollups are never touched.
+
+    Returns:
+        dict: collection name -> number of bucket documents written
+    """
+    written = {}
+    for unit, name in ROLLUP_COLLECTIONS.items():
+        scratch = db[f"{name}_rebuild"]
+        scratch.drop()
+        match = None
+        if keep_before is not None:
+            # The bucket the cutoff falls in was partly expired, so it is kept too
+            since = bucket_start(keep_before, unit)
+            since = since if since == keep_before else since + timedelta(**{f"{unit}s": 1})
+            match = {"timestamp": {"$gte": since}}
+            kept = []
+            for doc in db[name].find({"_id": {"$lt": since}}):
+                kept.append(doc)
+                if len(kept) >= batch_size:
+                    scratch.insert_many(kept, ordered=False)
+                    kept = []
+            if kept:
+                scratch.insert_many(kept, ordered=False)
+        flows_pipeline, anomalies_pipeline = raw_rollup_pipelines(unit, match)
+
+        batch = []
+        for doc in db["flows"].aggregate(flows_pipeline, allowDiskUse=True):
+            doc["protocols"] = protocols_to_dict(doc["protocols"])
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                scratch.insert_many(batch, ordered=False)
+                batch = []
+        if batch:
+            scratch.insert_many(batch, ordered=False)
+
+        updates = []
+        for doc in db["anomalies"].aggregate(anomalies_pipeline, allowDiskUse=True):
+            start = doc.pop("_id")
+            updates.append(UpdateOne({"_id": start}, {"$set": doc}, upsert=True))
+            if len(updates) >= batch_size:
+                scratch.bulk_write(updates, ordered=False)
+                updates = []
+        if updates:
+            scratch.bulk_write(updates, ordered=False)
+
+        written[name] = scratch.estimated_document_count()
+        if written[name]:
+            scratch.rename(name, dropTarget=True)
+        else:
+            db[name].drop()
+    return written
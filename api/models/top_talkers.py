@@ -0,0 +1,254 @@
+"""Heavy-hitter sketches of source and destination IPs, kept by the consumers."""
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from api.models.database import write_collection
+from api.models.rollups import bucket_start
+from pipeline.heavy_hitters import SpaceSaving
+
+load_dotenv()
+
+TALKERS_COLLECTION = "top_talkers"
+TALKER_FIELDS = ("src_ip", "dst_ip")
+# Counters per sketch; see SpaceSaving for the error bounds this gives
+TOP_TALKERS_CAPACITY = int(os.getenv("TOP_TALKERS_CAPACITY", "1000"))
+# How often each consumer persists its open window
+TOP_TALKERS_FLUSH_S = float(os.getenv("TOP_TALKERS_FLUSH_S", "10"))
+# sketch: answer top talkers from the sketches; exact: $group over raw flows
+TOP_TALKERS_MODE = os.getenv("TOP_TALKERS_MODE", "sketch")
+
+# Documents in TALKERS_COLLECTION:
+#   "<field>:all"                       sketch of every folded window, with a version for updates
+#   "<field>:<hour>:<consumer id>"      one consumer's sketch of one arrival hour; folded into
+#                                       "<field>:all" (and flagged) once the hour has passed
+
+
+def _total_id(field):
+    return f"{field}:all"
+
+
+def fold_into_total(db, field, sketch, retries=20):
+    """Merge a sketch into the all-time document with an optimistic version check."""
+    collection = write_collection(db, TALKERS_COLLECTION)
+    for _ in range(retries):
+        doc = collection.find_one({"_id": _total_id(field)})
+        total = SpaceSaving.from_dict(doc["sketch"]) if doc else SpaceSaving(sketch.capacity)
+        total.merge(sketch)
+        update = {"field": field, "sketch": total.to_dict(), "version": (doc["version"] + 1) if doc else 1}
+        try:
+            if doc is None:
+                collection.insert_one({"_id": _total_id(field), **update})
+                return
+            if collection.replace_one({"_id": _total_id(field), "version": doc["version"]}, update).matched_count:
+                return
+        except DuplicateKeyError:
+            pass
+    raise RuntimeError(f"Could not fold a {field} window into the top talkers total")
+
+
+def fold_stale_windows(db, before):
+    """
+    Fold windows older than before that their consumer never folded (it stopped or crashed).
+
+    Each window is claimed by flipping its folded flag first, so concurrent
+    consumers never fold the same window twice.
+    """
+    collection = write_collection(db, TALKERS_COLLECTION)
+    folded = 0
+    while True:
+        doc = collection.find_one_and_update(
+            {"window": {"$lt": before}, "folded": False},
+            {"$set": {"folded": True}}
+        )
+        if doc is None:
+            return folded
+        fold_into_total(db, doc["field"], SpaceSaving.from_dict(doc["sketch"]))
+        folded += 1
+
+
+class TopTalkerTracker:
+    """
+    Per-consumer sketches of the current arrival hour.
+
+    Windows follow the wall clock rather than flow timestamps, so a late
+    flow never reopens a window that was already folded. The open window is
+    written every flush_interval seconds; when the hour changes the finished
+    window is written one last time and folded into the all-time sketch.
+    """
+
+    def __init__(self, db, capacity=TOP_TALKERS_CAPACITY, flush_interval=TOP_TALKERS_FLUSH_S):
+        self.db = db
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.consumer_id = f"{socket.gethostname()}-{self.pid}-{uuid.uuid4().hex[:6]}"
+        self.lock = threading.Lock()
+        self.window = None
+        self.sketches = {}
+        self.last_flush = time.monotonic()
+
+    def _start_window(self, window):
+        self.window = window
+        self.sketches = {field: SpaceSaving(self.capacity) for field in TALKER_FIELDS}
+
+    def add(self, flow_docs):
+        """Count a written batch of flow documents."""
+        window = bucket_start(datetime.utcnow(), "hour")
+        with self.lock:
+            if self.window != window:
+                if self.window is not None:
+                    self._close_window()
+                    fold_stale_windows(self.db, self.window)
+                self._start_window(window)
+            for field in TALKER_FIELDS:
+                counts = Counter(doc.get(field) for doc in flow_docs)
+                counts.pop(None, None)
+                self.sketches[field].update(counts)
+
+    def maybe_flush(self):
+        if time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Persist the open window."""
+        with self.lock:
+            if self.window is not None:
+                self._write(folded=False)
+            self.last_flush = time.monotonic()
+
+    def _doc(self, field, sketch, folded):
+        return {"field": field, "window": self.window, "consumer": self.consumer_id,
+                "sketch": sketch.to_dict(), "folded": folded}
+
+    def _write(self, folded):
+        collection = write_collection(self.db, TALKERS_COLLECTION)
+        for field, sketch in self.sketches.items():
+            collection.replace_one({"_id": f"{field}:{self.window.isoformat()}:{self.consumer_id}"},
+                                   self._doc(field, sketch, folded), upsert=True)
+
+    def _close_window(self):
+        """Write the finished window one last time and fold it into the all-time sketch."""
+        collection = write_collection(self.db, TALKERS_COLLECTION)
+        for field, sketch in self.sketches.items():
+            try:
+                # Claimed like fold_stale_windows does, so the window is folded once
+                collection.update_one(
+                    {"_id": f"{field}:{self.window.isoformat()}:{self.consumer_id}", "folded": False},
+                    {"$set": self._doc(field, sketch, True)},
+                    upsert=True
+                )
+            except DuplicateKeyError:
+                # This consumer sat idle long enough for another one to fold
+                # the window from its last flush
+                continue
+            fold_into_total(self.db, field, sketch)
+
+
+_tracker = None
+
+
+def track_talkers(db, flow_docs):
+    """Count a written batch in this process's tracker and persist it when due."""
+    global _tracker
+    # Forked workers must not share the parent's tracker or consumer id
+    if _tracker is None or _tracker.pid != os.getpid():
+        _tracker = TopTalkerTracker(db)
+    _tracker.add(flow_docs)
+    _tracker.maybe_flush()
+
+
+def flush_talkers():
+    """Persist this process's open window (call on shutdown)."""
+    if _tracker is not None:
+        _tracker.flush()
+
+
+async def sketch_top_talkers(db, hours=None):
+    """
+    Merged sketches per field, from the persisted documents.
+
+    Args:
+        db: Motor database
+        hours: Only windows of the last N arrival hours (rounded out to whole
+            hours); None for all time
+
+    Returns:
+        dict: field -> SpaceSaving, or None when no sketches exist yet
+    """
+    collection = db[TALKERS_COLLECTION]
+    if hours:
+        since = bucket_start(datetime.utcnow() - timedelta(hours=hours), "hour")
+        query = {"window": {"$gte": since}}
+    else:
+        # The all-time documents plus windows not folded into them yet
+        query = {"$or": [{"_id": {"$in": [_total_id(field) for field in TALKER_FIELDS]}},
+                         {"folded": False}]}
+
+    merged = {}
+    async for doc in collection.find(query, {"field": 1, "sketch": 1}):
+        sketch = SpaceSaving.from_dict(doc["sketch"])
+        if doc["field"] in merged:
+            merged[doc["field"]].merge(sketch)
+        else:
+            merged[doc["field"]] = sketch
+    return merged or None
+
+
+async def exact_top_talkers(db, hours=None, limit=10):
+    """
+    Exact top talkers with one $facet pass over raw flows.
+
+    Returns:
+        dict: field -> (total flows counted, list of (ip, count))
+    """
+    match = [{"$match": {"timestamp": {"$gte": datetime.utcnow() - timedelta(hours=hours)}}}] if hours else []
+    facets = {
+        field: [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": limit}
+        ]
+        for field in TALKER_FIELDS
+    }
+    facets["total"] = [{"$count": "n"}]
+    result = await db["flows"].aggregate(match + [{"$facet": facets}], allowDiskUse=True).to_list(length=None)
+    result = result[0] if result else {}
+    total = result["total"][0]["n"] if result.get("total") else 0
+    return {field: (total, [(doc["_id"], doc["count"]) for doc in result.get(field, [])])
+            for field in TALKER_FIELDS}
+
+
+def rebuild_top_talkers(db, capacity=TOP_TALKERS_CAPACITY):
+    """
+    Replace every sketch with exact counts from the raw flows.
+
+    Keeps the capacity largest counts per field (error 0); floor is the
+    largest count that did not fit. Stop the consumers first: their open
+    windows would otherwise be counted on top of the rebuilt totals.
+
+    Returns:
+        dict: field -> number of keys kept
+    """
+    collection = db[TALKERS_COLLECTION]
+    kept = {}
+    for field in TALKER_FIELDS:
+        counts = list(db["flows"].aggregate([
+            {"$match": {field: {"$type": "string"}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": capacity + 1}
+        ], allowDiskUse=True))
+        n = db["flows"].count_documents({field: {"$type": "string"}})
+        sketch = SpaceSaving(capacity, n=n,
+                             floor=counts[capacity]["count"] if len(counts) > capacity else 0,
+                             items={doc["_id"]: [doc["count"], 0] for doc in counts[:capacity]})
+        collection.delete_many({"field": field})
+        collection.insert_one({"_id": _total_id(field), "field": field, "sketch": sketch.to_dict(), "version": 1})
+        kept[field] = len(sketch.items)
+    return kept
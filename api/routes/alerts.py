@@ -2,59 +2,96 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
-from api.models.database import get_database
-from api.models.Alert import Alert
+from api.models.database import get_async_database, write_collection
+from api.models.Alert import Alert, AlertStatusBulkUpdate, AlertStatusFilterUpdate
+from api.models.pagination import fetch_page, NEXT_CURSOR_HEADER
+from api.models.responses import FastJSONResponse
+from api.models.alert_counters import (
+    ALERT_STATUSES, read_alert_counters, increment_alert_counters_async, status_move, set_alert_status_many
+)
+from api.models.rollups import hourly_buckets
+from pipeline.timestamps import parse_timestamp
 from bson import ObjectId
+import asyncio
 
 router = APIRouter(prefix="/api/alerts", tags=["alerts"])
 
+# Alert response fields (except id) and their defaults; the listing fetches
+# only these and returns the documents without building Alert models
+ALERT_FIELDS = {name: None if field.is_required() else field.default
+                for name, field in Alert.model_fields.items() if name != "id"}
 
-@router.get("/", response_model=List[Alert])
+
+def alert_query(status=None, hours=None):
+    """MongoDB filter for the alert listing and export filters."""
+    query = {}
+    
+    if status:
+        query["status"] = status
+    
+    if hours:
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        query["timestamp"] = {"$gte": cutoff_time}
+    
+    return query
+
+
+def alert_dict(doc):
+    """Alert response fields of a projected document, in Alert model order."""
+    alert = {name: doc.get(name, default) for name, default in ALERT_FIELDS.items()}
+    alert["id"] = str(doc["_id"])
+    return alert
+
+
+@router.get("/", response_model=List[Alert], response_class=FastJSONResponse)
 async def get_alerts(
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header value from the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True, description="Use cursor instead; cost grows with offset"),
     status: Optional[str] = None,
-    hours: Optional[int] = Query(None, description="Filter alerts from last N hours")
+    hours: Optional[int] = Query(None, description="Filter alerts from last N hours"),
+    features: bool = Query(True, description="Include each alert's features sub-document")
 ):
     """
-    Get anomaly alerts.
+    Get anomaly alerts, newest first.
+    
+    When more alerts follow, the X-Next-Cursor response header holds the
+    cursor for the next page.
     
     Args:
         limit: Maximum number of alerts to return
-        offset: Number of alerts to skip
+        cursor: Opaque cursor from the previous page
+        offset: Number of alerts to skip (deprecated)
         status: Filter by status (new, acknowledged, resolved)
         hours: Filter alerts from last N hours
+        features: Include features (null when false)
     """
-    db = get_database()
+    db = get_async_database()
     collection = db["anomalies"]
     
-    query = {}
-    
-    if status:
-        query["status"] = status
-    
-    if hours:
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        query["timestamp"] = {"$gte": cutoff_time.isoformat()}
+    query = alert_query(status, hours)
+    projection = dict.fromkeys(ALERT_FIELDS, 1)
+    if not features:
+        del projection["features"]
     
-    cursor = collection.find(query).sort("timestamp", -1).skip(offset).limit(limit)
-    alerts = []
-    
-    for doc in cursor:
-        doc["id"] = str(doc.pop("_id"))
-        alerts.append(Alert(**doc))
+    try:
+        docs, next_cursor = await fetch_page(collection, query, limit, cursor=cursor, offset=offset,
+                                             projection=projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return alerts
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse([alert_dict(doc) for doc in docs], headers=headers)
 
 
 @router.get("/{alert_id}", response_model=Alert)
 async def get_alert(alert_id: str):
     """Get a specific alert by ID."""
-    db = get_database()
+    db = get_async_database()
     collection = db["anomalies"]
     
     try:
-        doc = collection.find_one({"_id": ObjectId(alert_id)})
+        doc = await collection.find_one({"_id": ObjectId(alert_id)})
         if not doc:
             raise HTTPException(status_code=404, detail="Alert not found")
         
@@ -67,36 +104,25 @@ async def get_alert(alert_id: str):
 @router.get("/stats/summary")
 async def get_alert_stats():
     """Get summary statistics for alerts."""
-    db = get_database()
-    collection = db["anomalies"]
-    
-    total = collection.count_documents({})
-    new_count = collection.count_documents({"status": "new"})
-    acknowledged_count = collection.count_documents({"status": "acknowledged"})
-    resolved_count = collection.count_documents({"status": "resolved"})
+    db = get_async_database()
     
     # Get alerts from last 24 hours
     cutoff_time = datetime.utcnow() - timedelta(hours=24)
-    recent_count = collection.count_documents({
-        "timestamp": {"$gte": cutoff_time.isoformat()}
-    })
-    
-    # Average score
-    pipeline = [
-        {"$group": {
-            "_id": None,
-            "avg_score": {"$avg": "$score"}
-        }}
-    ]
-    result = list(collection.aggregate(pipeline))
-    avg_score = result[0]["avg_score"] if result else 0.0
+    
+    # Totals are one point read of the counters document; the 24h count
+    # comes from the anomaly counts already kept in the rollups
+    counters, buckets = await asyncio.gather(
+        read_alert_counters(db),
+        hourly_buckets(db, cutoff_time)
+    )
+    avg_score = counters["score_sum"] / counters["score_n"] if counters["score_n"] else 0.0
     
     return {
-        "total": total,
-        "new": new_count,
-        "acknowledged": acknowledged_count,
-        "resolved": resolved_count,
-        "recent_24h": recent_count,
+        "total": counters["total"],
+        "new": counters["new"],
+        "acknowledged": counters["acknowledged"],
+        "resolved": counters["resolved"],
+        "recent_24h": sum(bucket["anomalies"] for bucket in buckets.values()),
         "avg_score": round(avg_score, 4)
     }
 
@@ -104,22 +130,89 @@ async def get_alert_stats():
 @router.patch("/{alert_id}/status")
 async def update_alert_status(alert_id: str, status: str = Query(..., description="new, acknowledged, or resolved")):
     """Update alert status."""
-    if status not in ["new", "acknowledged", "resolved"]:
+    if status not in ALERT_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status. Must be: new, acknowledged, or resolved")
     
-    db = get_database()
-    collection = db["anomalies"]
+    db = get_async_database()
+    collection = write_collection(db, "anomalies", "triage")
     
     try:
-        result = collection.update_one(
-            {"_id": ObjectId(alert_id)},
-            {"$set": {"status": status}}
-        )
-        
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Alert not found")
-        
-        return {"message": f"Alert status updated to {status}", "alert_id": alert_id}
+        alert_oid = ObjectId(alert_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid alert ID: {str(e)}")
+    
+    # Atomically read the previous status while changing it, so concurrent
+    # PATCHes each move the counters from the status they actually replaced
+    previous = await collection.find_one_and_update(
+        {"_id": alert_oid, "status": {"$ne": status}},
+        {"$set": {"status": status}},
+        projection={"status": 1}
+    )
+    if previous is not None:
+        await increment_alert_counters_async(db, status_move(previous.get("status"), status), "triage")
+    elif not await collection.count_documents({"_id": alert_oid}, limit=1):
+        raise HTTPException(status_code=404, detail="Alert not found")
+    
+    return {"message": f"Alert status updated to {status}", "alert_id": alert_id}
+
+
+@router.patch("/status")
+async def update_alert_status_bulk(update: AlertStatusBulkUpdate):
+    """
+    Update the status of a list of alerts in one request.
+    
+    Returns:
+        Counts of alerts found with the requested status afterwards (matched)
+        and alerts whose status changed (modified)
+    """
+    if update.status not in ALERT_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status. Must be: new, acknowledged, or resolved")
+    
+    try:
+        ids = [ObjectId(alert_id) for alert_id in update.ids]
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid alert ID: {str(e)}")
+    
+    db = get_async_database()
+    matched, modified = await set_alert_status_many(db, {"_id": {"$in": ids}}, update.status)
+    return {"status": update.status, "matched": matched, "modified": modified}
 
+
+@router.patch("/status/filter")
+async def update_alert_status_by_filter(update: AlertStatusFilterUpdate):
+    """
+    Update the status of every alert matching a filter, e.g. a burst from one scanner.
+    
+    At least one of src_ip, dst_ip, start, end, min_score or max_score is
+    required, so an empty filter cannot change every alert by accident.
+    
+    Returns:
+        Counts of alerts found with the requested status afterwards (matched)
+        and alerts whose status changed (modified)
+    """
+    if update.status not in ALERT_STATUSES:
+        raise HTTPException(status_code=400, detail="Invalid status. Must be: new, acknowledged, or resolved")
+    
+    query = {}
+    if update.src_ip:
+        query["src_ip"] = update.src_ip
+    if update.dst_ip:
+        query["dst_ip"] = update.dst_ip
+    if update.start or update.end:
+        query["timestamp"] = {}
+        if update.start:
+            query["timestamp"]["$gte"] = parse_timestamp(update.start)
+        if update.end:
+            query["timestamp"]["$lt"] = parse_timestamp(update.end)
+    if update.min_score is not None or update.max_score is not None:
+        query["score"] = {}
+        if update.min_score is not None:
+            query["score"]["$gte"] = update.min_score
+        if update.max_score is not None:
+            query["score"]["$lte"] = update.max_score
+    if not query:
+        raise HTTPException(status_code=400, detail="Provide at least one filter")
+    
+    db = get_async_database()
+    matched, modified = await set_alert_status_many(db, query, update.status)
+    return {"status": update.status, "matched": matched, "modified": modified}
@@ -0,0 +1,66 @@
+"""API routes for streaming bulk export of flows and alerts."""
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from datetime import datetime
+from api.models.database import get_async_analytics_database
+from api.models.export import (
+    EXPORT_FORMATS, FLOW_COLUMNS, FLOW_PROJECTION, ALERT_COLUMNS, ALERT_PROJECTION,
+    flow_row, alert_row, require_pyarrow, stream_export
+)
+from api.routes.flows import flow_query
+from api.routes.alerts import alert_query
+
+router = APIRouter(prefix="/api/export", tags=["export"])
+
+FORMAT_PATTERN = "^(" + "|".join(EXPORT_FORMATS) + ")$"
+
+
+def export_response(stream, name, export_format):
+    """Attachment response for an export stream."""
+    if export_format in ("arrow", "parquet"):
+        # Checked before streaming starts, so a missing dependency is a clean error
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            raise HTTPException(status_code=501, detail=str(e))
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"{name}-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{extension}"
+    return StreamingResponse(stream, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+
+@router.get("/flows")
+async def export_flows(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson, csv, arrow or parquet"),
+    src_ip: Optional[str] = None,
+    dst_ip: Optional[str] = None,
+    protocol: Optional[str] = None,
+    hours: Optional[int] = Query(None, description="Export flows from last N hours")
+):
+    """
+    Export every matching flow, oldest first, without a row limit.
+    
+    Takes the same filters as GET /api/flows.
+    """
+    db = get_async_analytics_database()
+    stream = stream_export(db["flows"], flow_query(src_ip, dst_ip, protocol, hours),
+                           FLOW_PROJECTION, FLOW_COLUMNS, flow_row, format)
+    return export_response(stream, "flows", format)
+
+
+@router.get("/alerts")
+async def export_alerts(
+    format: str = Query("ndjson", pattern=FORMAT_PATTERN, description="ndjson, csv, arrow or parquet"),
+    status: Optional[str] = None,
+    hours: Optional[int] = Query(None, description="Export alerts from last N hours")
+):
+    """
+    Export every matching alert, oldest first, without a row limit.
+    
+    Takes the same filters as GET /api/alerts.
+    """
+    db = get_async_analytics_database()
+    stream = stream_export(db["anomalies"], alert_query(status, hours),
+                           ALERT_PROJECTION, ALERT_COLUMNS, alert_row, format)
+    return export_response(stream, "alerts", format)
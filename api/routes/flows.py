@@ -2,104 +2,102 @@
 from fastapi import APIRouter, HTTPException, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
-from api.models.database import get_database
+from api.models.database import get_async_database, get_async_analytics_database
 from api.models.FlowRecord import FlowRecord
+from api.models.pagination import fetch_page, NEXT_CURSOR_HEADER
+from api.models.responses import FastJSONResponse
+from api.models.rollups import rollup_totals, hourly_buckets, average
+import asyncio
 
 router = APIRouter(prefix="/api/flows", tags=["flows"])
 
+# FlowRecord response fields and their defaults; the listing fetches only
+# these and returns the documents without building FlowRecord models
+FLOW_FIELDS = {name: None if field.is_required() else field.default
+               for name, field in FlowRecord.model_fields.items()}
 
-@router.get("/", response_model=List[FlowRecord])
+
+def flow_query(src_ip=None, dst_ip=None, protocol=None, hours=None):
+    """MongoDB filter for the flow listing and export filters."""
+    query = {}
+    
+    if src_ip:
+        query["src_ip"] = src_ip
+    if dst_ip:
+        query["dst_ip"] = dst_ip
+    if protocol:
+        query["protocol"] = protocol.upper()
+    if hours:
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        query["timestamp"] = {"$gte": cutoff_time}
+    
+    return query
+
+
+@router.get("/", response_model=List[FlowRecord], response_class=FastJSONResponse)
 async def get_flows(
     limit: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor header value from the previous page"),
+    offset: int = Query(0, ge=0, deprecated=True, description="Use cursor instead; cost grows with offset"),
     src_ip: Optional[str] = None,
     dst_ip: Optional[str] = None,
     protocol: Optional[str] = None,
     hours: Optional[int] = Query(None, description="Filter flows from last N hours")
 ):
     """
-    Get network flows.
+    Get network flows, newest first.
+    
+    When more flows follow, the X-Next-Cursor response header holds the
+    cursor for the next page.
     
     Args:
         limit: Maximum number of flows to return
-        offset: Number of flows to skip
+        cursor: Opaque cursor from the previous page
+        offset: Number of flows to skip (deprecated)
         src_ip: Filter by source IP
         dst_ip: Filter by destination IP
         protocol: Filter by protocol
         hours: Filter flows from last N hours
     """
-    db = get_database()
+    db = get_async_database()
     collection = db["flows"]
     
-    query = {}
+    query = flow_query(src_ip, dst_ip, protocol, hours)
     
-    if src_ip:
-        query["src_ip"] = src_ip
-    if dst_ip:
-        query["dst_ip"] = dst_ip
-    if protocol:
-        query["protocol"] = protocol.upper()
-    if hours:
-        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-        query["timestamp"] = {"$gte": cutoff_time.isoformat()}
-    
-    cursor = collection.find(query).sort("timestamp", -1).skip(offset).limit(limit)
-    flows = []
+    try:
+        # _id is fetched for the page cursor but not returned
+        docs, next_cursor = await fetch_page(collection, query, limit, cursor=cursor, offset=offset,
+                                             projection=dict.fromkeys(FLOW_FIELDS, 1))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    for doc in cursor:
-        # Remove MongoDB _id field
-        doc.pop("_id", None)
-        flows.append(FlowRecord(**doc))
-    
-    return flows
+    flows = [{name: doc.get(name, default) for name, default in FLOW_FIELDS.items()} for doc in docs]
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return FastJSONResponse(flows, headers=headers)
 
 
 @router.get("/stats/summary")
 async def get_flow_stats():
-    """Get summary statistics for flows."""
-    db = get_database()
-    collection = db["flows"]
-    
-    total = collection.count_documents({})
+    """Get summary statistics for flows (answered from the rollups)."""
+    db = get_async_analytics_database()
     
     # Get flows from last 24 hours
     cutoff_time = datetime.utcnow() - timedelta(hours=24)
-    recent_count = collection.count_documents({
-        "timestamp": {"$gte": cutoff_time.isoformat()}
-    })
     
-    # Protocol distribution
-    pipeline = [
-        {"$group": {
-            "_id": "$protocol",
-            "count": {"$sum": 1}
-        }},
-        {"$sort": {"count": -1}}
-    ]
-    protocol_dist = {doc["_id"]: doc["count"] for doc in collection.aggregate(pipeline)}
+    # Independent queries, so their round trips overlap
+    total, recent_buckets = await asyncio.gather(
+        rollup_totals(db),
+        hourly_buckets(db, cutoff_time)
+    )
     
-    # Average stats
-    pipeline = [
-        {"$group": {
-            "_id": None,
-            "avg_bytes": {"$avg": "$bytes"},
-            "avg_packets": {"$avg": "$packets"},
-            "avg_duration": {"$avg": "$duration"}
-        }}
-    ]
-    result = list(collection.aggregate(pipeline))
-    avg_stats = result[0] if result else {
-        "avg_bytes": 0,
-        "avg_packets": 0,
-        "avg_duration": 0
-    }
+    # Protocol distribution, most common first
+    protocol_dist = dict(sorted(total["protocols"].items(), key=lambda item: -item[1]))
     
     return {
-        "total": total,
-        "recent_24h": recent_count,
+        "total": total["flows"],
+        "recent_24h": sum(bucket["flows"] for bucket in recent_buckets.values()),
         "protocol_distribution": protocol_dist,
-        "avg_bytes": round(avg_stats.get("avg_bytes", 0), 2),
-        "avg_packets": round(avg_stats.get("avg_packets", 0), 2),
-        "avg_duration": round(avg_stats.get("avg_duration", 0), 2)
+        "avg_bytes": round(average(total, "bytes"), 2),
+        "avg_packets": round(average(total, "packets"), 2),
+        "avg_duration": round(average(total, "duration"), 2)
     }
-
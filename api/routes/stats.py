@@ -1,65 +1,56 @@
 """API routes for statistics and baselines."""
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from typing import Optional
 from datetime import datetime, timedelta
-from api.models.database import get_database
+from api.models.database import get_async_analytics_database, pool_stats
 from api.models.Baseline import BaselineStats
-from collections import Counter
+from api.models.rollups import rollup_totals, hourly_buckets, average
+from api.models.cache import TTLCache
+from api.models.top_talkers import TALKER_FIELDS, TOP_TALKERS_MODE, sketch_top_talkers, exact_top_talkers
+from pipeline.timestamps import format_timestamp
+import asyncio
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# How long an assembled baseline is served before it is recomputed (0 disables caching)
+BASELINE_CACHE_TTL_S = float(os.getenv("BASELINE_CACHE_TTL_S", 30))
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
+baseline_cache = TTLCache(BASELINE_CACHE_TTL_S)
 
 
 @router.get("/baseline", response_model=BaselineStats)
 async def get_baseline():
-    """Get baseline statistics."""
-    db = get_database()
-    flows_collection = db["flows"]
-    anomalies_collection = db["anomalies"]
-    
-    # Total counts
-    total_flows = flows_collection.count_documents({})
-    total_anomalies = anomalies_collection.count_documents({})
-    anomaly_rate = (total_anomalies / total_flows) if total_flows > 0 else 0.0
-    
-    # Top source IPs
-    pipeline = [
-        {"$group": {"_id": "$src_ip", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    top_sources = [{"ip": doc["_id"], "count": doc["count"]} 
-                   for doc in flows_collection.aggregate(pipeline)]
-    
-    # Top destination IPs
-    pipeline = [
-        {"$group": {"_id": "$dst_ip", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 10}
-    ]
-    top_destinations = [{"ip": doc["_id"], "count": doc["count"]} 
-                        for doc in flows_collection.aggregate(pipeline)]
+    """Get baseline statistics (cached for BASELINE_CACHE_TTL_S seconds)."""
+    return await baseline_cache.get_or_compute("baseline", compute_baseline)
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Hit rate and compute time of the baseline cache."""
+    return {"baseline": baseline_cache.stats()}
+
+
+@router.get("/pool")
+async def get_pool_stats():
+    """MongoDB connection pool utilization and checkout wait times of this API process."""
+    return pool_stats()
+
+
+async def compute_baseline():
+    """Assemble BaselineStats from the rollups and the top talkers sketches."""
+    db = get_async_analytics_database()
     
-    # Protocol distribution
-    pipeline = [
-        {"$group": {"_id": "$protocol", "count": {"$sum": 1}}}
-    ]
-    protocol_dist = {doc["_id"]: doc["count"] 
-                     for doc in flows_collection.aggregate(pipeline)}
+    # Counts, protocol distribution and averages come from the hour rollups
+    total, talkers = await asyncio.gather(rollup_totals(db), top_talkers(db, limit=10))
     
-    # Average stats
-    pipeline = [
-        {"$group": {
-            "_id": None,
-            "avg_bytes": {"$avg": "$bytes"},
-            "avg_packets": {"$avg": "$packets"},
-            "avg_duration": {"$avg": "$duration"}
-        }}
-    ]
-    result = list(flows_collection.aggregate(pipeline))
-    avg_stats = result[0] if result else {
-        "avg_bytes": 0,
-        "avg_packets": 0,
-        "avg_duration": 0
-    }
+    total_flows = total["flows"]
+    total_anomalies = total["anomalies"]
+    anomaly_rate = (total_anomalies / total_flows) if total_flows > 0 else 0.0
+    top_sources = [{"ip": item["ip"], "count": item["count"]} for item in talkers["src_ip"]["top"]]
+    top_destinations = [{"ip": item["ip"], "count": item["count"]} for item in talkers["dst_ip"]["top"]]
     
     return BaselineStats(
         total_flows=total_flows,
@@ -67,58 +58,89 @@ async def get_baseline():
         anomaly_rate=round(anomaly_rate, 4),
         top_sources=top_sources,
         top_destinations=top_destinations,
-        protocol_distribution=protocol_dist,
-        avg_bytes=round(avg_stats.get("avg_bytes", 0), 2),
-        avg_packets=round(avg_stats.get("avg_packets", 0), 2),
-        avg_duration=round(avg_stats.get("avg_duration", 0), 2)
+        protocol_distribution=dict(total["protocols"]),
+        avg_bytes=round(average(total, "bytes"), 2),
+        avg_packets=round(average(total, "packets"), 2),
+        avg_duration=round(average(total, "duration"), 2)
     )
 
 
+async def top_talkers(db, hours=None, limit=10, mode=TOP_TALKERS_MODE):
+    """
+    Top source and destination IPs, from the sketches or exactly.
+    
+    Sketch mode falls back to exact counting while no sketches exist (e.g.
+    before the consumer has run, or after seeding without a rebuild).
+    
+    Returns:
+        dict: mode used plus, per field, the total flows counted, max_error
+            (an IP not listed occurred at most this often) and top
+            [{ip, count, error}] where the true count is within
+            [count - error, count]
+    """
+    sketches = await sketch_top_talkers(db, hours=hours) if mode == "sketch" else None
+    if sketches:
+        result = {"mode": "sketch"}
+        for field in TALKER_FIELDS:
+            sketch = sketches.get(field)
+            result[field] = {
+                "total": sketch.n if sketch else 0,
+                "max_error": sketch.floor if sketch else 0,
+                "top": [{"ip": ip, "count": count, "error": error}
+                        for ip, count, error in (sketch.top(limit) if sketch else [])]
+            }
+        return result
+    
+    exact = await exact_top_talkers(db, hours=hours, limit=limit)
+    result = {"mode": "exact"}
+    for field, (n, top) in exact.items():
+        result[field] = {
+            "total": n,
+            "max_error": 0,
+            "top": [{"ip": ip, "count": count, "error": 0} for ip, count in top]
+        }
+    return result
+
+
+@router.get("/top-talkers")
+async def get_top_talkers(
+    hours: Optional[int] = Query(None, ge=1, description="Only the last N hours (whole arrival hours in sketch mode)"),
+    limit: int = Query(10, ge=1, le=100),
+    mode: str = Query(TOP_TALKERS_MODE, pattern="^(sketch|exact)$",
+                      description="sketch: constant-time approximate counts; exact: scan raw flows")
+):
+    """Get the most frequent source and destination IPs."""
+    return await top_talkers(get_async_analytics_database(), hours=hours, limit=limit, mode=mode)
+
+
 @router.get("/time-series")
 async def get_time_series(hours: int = 24):
     """Get time series data for charts."""
-    db = get_database()
-    flows_collection = db["flows"]
-    anomalies_collection = db["anomalies"]
+    db = get_async_analytics_database()
     
     cutoff_time = datetime.utcnow() - timedelta(hours=hours)
     
+    # Hourly buckets from the rollups, exact from cutoff_time onwards
+    buckets = await hourly_buckets(db, cutoff_time)
+    
     # Flows over time (grouped by hour)
-    pipeline = [
-        {"$match": {"timestamp": {"$gte": cutoff_time.isoformat()}}},
-        {"$group": {
-            "_id": {"$substr": ["$timestamp", 0, 13]},  # Group by hour
-            "count": {"$sum": 1},
-            "avg_bytes": {"$avg": "$bytes"}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
     flows_series = [
         {
-            "time": doc["_id"],
-            "count": doc["count"],
-            "avg_bytes": round(doc["avg_bytes"], 2)
+            "time": format_timestamp(hour),
+            "count": bucket["flows"],
+            "avg_bytes": round(average(bucket, "bytes"), 2)
         }
-        for doc in flows_collection.aggregate(pipeline)
+        for hour, bucket in sorted(buckets.items()) if bucket["flows"]
     ]
     
     # Anomalies over time
-    pipeline = [
-        {"$match": {"timestamp": {"$gte": cutoff_time.isoformat()}}},
-        {"$group": {
-            "_id": {"$substr": ["$timestamp", 0, 13]},
-            "count": {"$sum": 1},
-            "avg_score": {"$avg": "$score"}
-        }},
-        {"$sort": {"_id": 1}}
-    ]
     anomalies_series = [
         {
-            "time": doc["_id"],
-            "count": doc["count"],
-            "avg_score": round(doc["avg_score"], 4)
+            "time": format_timestamp(hour),
+            "count": bucket["anomalies"],
+            "avg_score": round(average(bucket, "score"), 4)
         }
-        for doc in anomalies_collection.aggregate(pipeline)
+        for hour, bucket in sorted(buckets.items()) if bucket["anomalies"]
     ]
     
     return {
@@ -126,4 +148,3 @@ async def get_time_series(hours: int = 24):
         "anomalies": anomalies_series,
         "time_range_hours": hours
     }
-
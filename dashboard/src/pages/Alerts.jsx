@@ -1,10 +1,18 @@
 import React, { useState, useEffect } from 'react'
 import AlertTable from '../components/AlertTable'
 import MetricsCard from '../components/MetricsCard'
-import { getAlerts, updateAlertStatus, getAlertStats } from '../services/api'
+import { getAlertsPage, updateAlertStatus, getAlertStats, subscribeLive } from '../services/api'
+
+// Newest first, replacing any copies already listed
+const prependAlerts = (incoming, current) => {
+  const ids = new Set(incoming.map((a) => a.id))
+  return [...incoming].reverse().concat(current.filter((a) => !ids.has(a.id)))
+}
 
 const Alerts = () => {
   const [alerts, setAlerts] = useState([])
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [stats, setStats] = useState(null)
   const [loading, setLoading] = useState(true)
   const [statusFilter, setStatusFilter] = useState('all')
@@ -13,21 +21,34 @@ const Alerts = () => {
   useEffect(() => {
     loadAlerts()
     loadStats()
-    const interval = setInterval(() => {
-      loadAlerts()
-      loadStats()
-    }, 30000) // Refresh every 30 seconds
-    return () => clearInterval(interval)
+    // New alerts and counter changes are pushed by the API instead of polled
+    return subscribeLive({
+      alerts: (incoming) => {
+        const matching = incoming.filter((a) => statusFilter === 'all' || a.status === statusFilter)
+        if (matching.length) setAlerts((current) => prependAlerts(matching, current))
+      },
+      stats: (changed) => setStats((current) => ({ ...current, ...changed })),
+      resync: () => {
+        loadAlerts()
+        loadStats()
+      },
+    })
   }, [statusFilter])
 
+  const alertParams = () => {
+    // The table does not show features, so skip sending them
+    const params = { limit: 100, features: false }
+    if (statusFilter !== 'all') {
+      params.status = statusFilter
+    }
+    return params
+  }
+
   const loadAlerts = async () => {
     try {
-      const params = { limit: 100 }
-      if (statusFilter !== 'all') {
-        params.status = statusFilter
-      }
-      const data = await getAlerts(params)
-      setAlerts(data)
+      const page = await getAlertsPage(alertParams())
+      setAlerts(page.items)
+      setNextCursor(page.nextCursor)
     } catch (error) {
       console.error('Error loading alerts:', error)
       setError(error.message || 'Failed to load alerts.')
@@ -36,6 +57,20 @@ const Alerts = () => {
     }
   }
 
+  const loadMoreAlerts = async () => {
+    if (!nextCursor) return
+    setLoadingMore(true)
+    try {
+      const page = await getAlertsPage({ ...alertParams(), cursor: nextCursor })
+      setAlerts((current) => [...current, ...page.items])
+      setNextCursor(page.nextCursor)
+    } catch (error) {
+      console.error('Error loading more alerts:', error)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const loadStats = async () => {
     try {
       const data = await getAlertStats()
@@ -128,6 +163,18 @@ const Alerts = () => {
 
       {/* Alerts Table */}
       <AlertTable alerts={alerts} onStatusChange={handleStatusChange} />
+
+      {nextCursor && (
+        <div className="flex justify-center">
+          <button
+            onClick={loadMoreAlerts}
+            disabled={loadingMore}
+            className="px-4 py-2 bg-blue-600 text-white rounded hover:bg-blue-700 disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load older alerts'}
+          </button>
+        </div>
+      )}
     </div>
   )
 }
@@ -1,7 +1,23 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
+import { format } from 'date-fns'
 import MetricsCard from '../components/MetricsCard'
 import AnomalyChart from '../components/AnomalyChart'
-import { getBaseline, getTimeSeries, getAlertStats, getFlowStats } from '../services/api'
+import { getBaseline, getTimeSeries, getAlertStats, getFlowStats, subscribeLive } from '../services/api'
+
+// Charts and top talkers are not pushed; reload them at most this often while updates arrive
+const CHART_REFRESH_MS = 5 * 60 * 1000
+
+// Baseline with the pushed flow and alert totals applied
+const withTotals = (baseline, changed) => {
+  const total_flows = changed.total_flows ?? baseline.total_flows
+  const total_anomalies = changed.total ?? baseline.total_anomalies
+  return {
+    ...baseline,
+    total_flows,
+    total_anomalies,
+    anomaly_rate: total_flows > 0 ? total_anomalies / total_flows : 0,
+  }
+}
 
 const Dashboard = () => {
   const [baseline, setBaseline] = useState(null)
@@ -10,14 +26,26 @@ const Dashboard = () => {
   const [flowStats, setFlowStats] = useState(null)
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
+  const lastLoad = useRef(0)
 
   useEffect(() => {
     loadData()
-    const interval = setInterval(loadData, 30000) // Refresh every 30 seconds
-    return () => clearInterval(interval)
+    // Totals are pushed by the API instead of polled
+    return subscribeLive({
+      stats: (changed) => {
+        setAlertStats((current) => current && { ...current, ...changed })
+        setBaseline((current) => current && withTotals(current, changed))
+        if (Date.now() - lastLoad.current > CHART_REFRESH_MS) loadData()
+      },
+      alerts: (incoming) => {
+        setAlertStats((current) => current && { ...current, recent_24h: current.recent_24h + incoming.length })
+      },
+      resync: loadData,
+    })
   }, [])
 
   const loadData = async () => {
+    lastLoad.current = Date.now()
     try {
       const [baselineData, timeSeriesData, alertStatsData, flowStatsData] = await Promise.all([
         getBaseline(),
@@ -67,7 +95,7 @@ const Dashboard = () => {
   }
 
   const flowsChartData = timeSeries?.flows ? {
-    labels: timeSeries.flows.map(f => f.time),
+    labels: timeSeries.flows.map(f => format(new Date(f.time), 'MMM dd HH:mm')),
     datasets: [
       {
         label: 'Flow Count',
@@ -80,7 +108,7 @@ const Dashboard = () => {
   } : null
 
   const anomaliesChartData = timeSeries?.anomalies ? {
-    labels: timeSeries.anomalies.map(a => a.time),
+    labels: timeSeries.anomalies.map(a => format(new Date(a.time), 'MMM dd HH:mm')),
     datasets: [
       {
         label: 'Anomaly Count',
@@ -39,12 +39,24 @@ api.interceptors.response.use(
   }
 )
 
+// Listings page with keyset cursors: pass the previous page's nextCursor as
+// params.cursor to fetch the next page at the same cost regardless of depth
+const getPage = async (path, params) => {
+  const response = await api.get(path, { params })
+  return {
+    items: response.data,
+    nextCursor: response.headers['x-next-cursor'] || null,
+  }
+}
+
 // Alerts API
 export const getAlerts = async (params = {}) => {
   const response = await api.get('/api/alerts', { params })
   return response.data
 }
 
+export const getAlertsPage = (params = {}) => getPage('/api/alerts', params)
+
 export const getAlert = async (alertId) => {
   const response = await api.get(`/api/alerts/${alertId}`)
   return response.data
@@ -66,6 +78,8 @@ export const getFlows = async (params = {}) => {
   return response.data
 }
 
+export const getFlowsPage = (params = {}) => getPage('/api/flows', params)
+
 export const getFlowStats = async () => {
   const response = await api.get('/api/flows/stats/summary')
   return response.data
@@ -84,5 +98,22 @@ export const getTimeSeries = async (hours = 24) => {
   return response.data
 }
 
+// Live updates pushed by the API (server-sent events from /api/stream).
+// handlers: { alerts(newAlerts), stats(changedFields), resync() }; resync is
+// also called after EventSource reconnects, since events may have been missed.
+// Returns a function that closes the stream.
+export const subscribeLive = (handlers) => {
+  const source = new EventSource(`${API_BASE_URL}/api/stream`)
+  let opened = false
+  source.addEventListener('open', () => {
+    if (opened && handlers.resync) handlers.resync()
+    opened = true
+  })
+  for (const [event, handler] of Object.entries(handlers)) {
+    source.addEventListener(event, (e) => handler(JSON.parse(e.data)))
+  }
+  return () => source.close()
+}
+
 export default api
 
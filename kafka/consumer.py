@@ -1,8 +1,21 @@
 """Kafka consumer that processes network flows through ML pipeline."""
-from kafka import KafkaConsumer
-import json
+from kafka import KafkaConsumer, TopicPartition, OffsetAndMetadata
+from kafka.consumer.subscription_state import ConsumerRebalanceListener
+from kafka.errors import KafkaError
+import argparse
+import asyncio
+import concurrent.futures
+import gc
+import logging
+import multiprocessing
 import os
+import queue
+import signal
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from dotenv import load_dotenv
 
 # Add parent directory to path for imports
@@ -10,100 +23,985 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from ml_engine.feature_extractor import FeatureExtractor
 from ml_engine.anomaly_detector import AnomalyDetector
-from api.models.database import get_database
+from ml_engine.model_registry import ModelRegistry, ModelWatcher
+from api.models.database import get_database, get_async_database, write_collection, pool_stats
+from api.models.indexes import ensure_indexes
+from api.models.rollups import write_rollups, write_rollups_async
+from api.models.alert_counters import alert_increments, increment_alert_counters, increment_alert_counters_async
+from api.models.top_talkers import track_talkers, flush_talkers
+from pipeline.codec import decode_flow, decode_record, codec_from_headers
+from pipeline.timestamps import parse_timestamp
+from pipeline.metrics import (
+    FLOWS_CONSUMED, FLOWS_SCORED, ANOMALIES, STAGE_SECONDS, BATCH_SIZES, CONSUMER_LAG,
+    METRICS_PORT, PROMETHEUS_MULTIPROC_DIR, metrics_enabled, start_metrics_server, mark_process_dead
+)
 
 load_dotenv()
 
 KAFKA_BROKER = os.getenv("KAFKA_BROKER", "localhost:9092")
 KAFKA_TOPIC = os.getenv("KAFKA_TOPIC", "network_flows")
 IFOREST_MODEL_PATH = os.getenv("IFOREST_MODEL_PATH", "ml_engine/models/isolation_forest.pkl")
+MODEL_TYPE = os.getenv("MODEL_TYPE", "isolation_forest")
+CONSUMER_MODE = os.getenv("CONSUMER_MODE", "batch")
+BATCH_SIZE = int(os.getenv("CONSUMER_BATCH_SIZE", "500"))
+BATCH_LINGER_MS = int(os.getenv("CONSUMER_BATCH_LINGER_MS", "200"))
+CONSUMER_WORKERS = int(os.getenv("CONSUMER_WORKERS", "1"))
+POOL_STRATEGY = os.getenv("CONSUMER_POOL_STRATEGY", "partitions")
+REPORT_INTERVAL_S = float(os.getenv("CONSUMER_REPORT_INTERVAL_S", "5"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("CONSUMER_PIPELINE_QUEUE_SIZE", "8"))
+# Consumers sharing a group id split the topic's partitions; empty disables groups
+CONSUMER_GROUP_ID = os.getenv("CONSUMER_GROUP_ID", "netsage-ml-scorers")
+AUTO_OFFSET_RESET = os.getenv("CONSUMER_OFFSET_RESET", "latest")
+# Stream mode commits written offsets asynchronously at most this often
+STREAM_COMMIT_INTERVAL_MS = int(os.getenv("CONSUMER_STREAM_COMMIT_INTERVAL_MS", "1000"))
+# DEBUG logs every anomaly (and every normal flow in stream mode)
+LOG_LEVEL = os.getenv("CONSUMER_LOG_LEVEL", "INFO")
+
+logger = logging.getLogger("netsage.consumer")
+
+
+def create_consumer(max_poll_records):
+    """
+    Create an unsubscribed Kafka consumer for the flows topic.
+
+    Values are left as raw bytes and decoded with decode_record, which picks
+    the wire codec from the message headers. Offsets are never auto-committed:
+    with a consumer group they are committed explicitly once a batch's Mongo
+    writes have succeeded.
+
+    Args:
+        max_poll_records: Upper bound on records returned by one poll
+    """
+    return KafkaConsumer(
+        bootstrap_servers=KAFKA_BROKER,
+        group_id=CONSUMER_GROUP_ID or None,
+        auto_offset_reset=AUTO_OFFSET_RESET,
+        enable_auto_commit=False,
+        max_poll_records=max(max_poll_records, 1)
+    )
+
+
+def subscribe(consumer, on_revoke=None):
+    """Subscribe to the flows topic, flushing pending work before a rebalance."""
+    if CONSUMER_GROUP_ID and on_revoke is not None:
+        consumer.subscribe([KAFKA_TOPIC], listener=FlushOnRevoke(on_revoke))
+    else:
+        consumer.subscribe([KAFKA_TOPIC])
+
+
+def offsets_to_commit(records):
+    """Next offset to consume for every partition present in records."""
+    offsets = {}
+    for record in records:
+        tp = TopicPartition(record.topic, record.partition)
+        offsets[tp] = max(offsets.get(tp, 0), record.offset + 1)
+    return {tp: OffsetAndMetadata(offset, None) for tp, offset in offsets.items()}
+
+
+class FlushOnRevoke(ConsumerRebalanceListener):
+    """Rebalance listener that flushes in-flight batches before partitions move."""
+
+    def __init__(self, on_revoke):
+        self.on_revoke = on_revoke
+
+    def on_partitions_revoked(self, revoked):
+        if revoked:
+            print(f"🔀 Partitions revoked: {sorted(tp.partition for tp in revoked)}, flushing pending batch")
+            self.on_revoke()
+
+    def on_partitions_assigned(self, assigned):
+        print(f"🔀 Partitions assigned: {sorted(tp.partition for tp in assigned)}")
+
+
+def flow_timestamp(flow):
+    """Flow timestamp as a BSON-ready datetime; flows without a valid one get the receive time."""
+    return parse_timestamp(flow.get("timestamp")) or datetime.utcnow()
+
+
+def build_flow_doc(flow):
+    """Build the raw flow document stored in the flows collection."""
+    return {
+        "timestamp": flow_timestamp(flow),
+        "src_ip": flow.get("src_ip"),
+        "dst_ip": flow.get("dst_ip"),
+        "protocol": flow.get("protocol"),
+        "bytes": flow.get("bytes"),
+        "packets": flow.get("packets"),
+        "duration": flow.get("duration"),
+        "src_port": flow.get("src_port"),
+        "dst_port": flow.get("dst_port")
+    }
+
+
+def build_alert_doc(flow, score, anomaly_detector):
+    """Build the anomaly alert document stored in the anomalies collection."""
+    return {
+        "timestamp": flow_timestamp(flow),
+        "src_ip": flow.get("src_ip"),
+        "dst_ip": flow.get("dst_ip"),
+        "protocol": flow.get("protocol"),
+        "score": float(score),
+        "model": anomaly_detector.metadata.get("model_type", anomaly_detector.model_type),
+        # None when the model was loaded from IFOREST_MODEL_PATH instead of the registry
+        "model_version": anomaly_detector.version,
+        "features": {
+            "bytes": flow.get("bytes"),
+            "packets": flow.get("packets"),
+            "duration": flow.get("duration")
+        },
+        "status": "new"
+    }
+
+
+def score_batch(flows, feature_extractor, anomaly_detector):
+    """
+    Build flow documents and alerts for a batch without touching the database.
+
+    Returns:
+        tuple: (flow_docs, alerts)
+    """
+    flow_docs = [build_flow_doc(flow) for flow in flows]
+
+    with STAGE_SECONDS.labels("extract").time():
+        X, valid_indices = feature_extractor.extract_batch(flows, return_indices=True)
+    if X is None:
+        return flow_docs, []
+
+    with STAGE_SECONDS.labels("score").time():
+        is_anomalies, scores = anomaly_detector.detect_batch(X)
+
+    alerts = []
+    for idx, is_anomaly, score in zip(valid_indices, is_anomalies, scores):
+        if is_anomaly:
+            # Same normalization as AnomalyDetector.detect (lower is more anomalous)
+            alerts.append(build_alert_doc(flows[idx], abs(score), anomaly_detector))
+
+    FLOWS_SCORED.inc(len(valid_indices))
+    ANOMALIES.inc(len(alerts))
+    BATCH_SIZES.observe(len(flows))
+    return flow_docs, alerts
+
+
+def decode_batch(records):
+    """Decode polled records, counting them and timing the decode stage."""
+    with STAGE_SECONDS.labels("decode").time():
+        flows = [decode_record(record) for record in records]
+    FLOWS_CONSUMED.inc(len(flows))
+    return flows
+
+
+def log_alerts(alerts, prefix=""):
+    """Log each alert at DEBUG (skipped entirely at higher levels)."""
+    if logger.isEnabledFor(logging.DEBUG):
+        for alert in alerts:
+            logger.debug(f"🚨 {prefix}ANOMALY DETECTED: {alert['src_ip']} -> {alert['dst_ip']} "
+                         f"(score: {alert['score']:.4f})")
+
+
+def process_batch(flows, feature_extractor, anomaly_detector, flows_collection, anomalies_collection):
+    """
+    Score a batch of flows and persist them with one bulk write per collection.
+
+    Args:
+        flows: List of flow dictionaries
+        feature_extractor: FeatureExtractor instance
+        anomaly_detector: AnomalyDetector with a loaded model
+        flows_collection: Collection receiving raw flows
+        anomalies_collection: Collection receiving anomaly alerts
+
+    Returns:
+        list: Alert documents written for this batch
+    """
+    if not flows:
+        return []
+
+    flow_docs, alerts = score_batch(flows, feature_extractor, anomaly_detector)
+
+    with STAGE_SECONDS.labels("write").time():
+        flows_collection.insert_many(flow_docs, ordered=False)
+        if alerts:
+            anomalies_collection.insert_many(alerts, ordered=False)
+            increment_alert_counters(anomalies_collection.database, alert_increments(alerts))
+        write_rollups(flows_collection.database, flow_docs, alerts)
+        track_talkers(flows_collection.database, flow_docs)
+
+    return alerts
+
+
+class FlowBatcher:
+    """
+    Accumulates polled records and hands them off as one batch.
+
+    With a consumer group, offsets are committed only after handle_batch
+    returns, i.e. after the batch's bulk writes succeeded. flush() is also
+    called from the rebalance listener so a half-filled batch is written and
+    committed before its partitions move to another consumer.
+    """
+
+    def __init__(self, consumer, handle_batch, commit=bool(CONSUMER_GROUP_ID)):
+        self.consumer = consumer
+        self.handle_batch = handle_batch
+        self.commit = commit
+        self.pending = []
+
+    def fill(self, batch_size, linger_ms):
+        """Poll until batch_size records are pending or linger_ms has passed."""
+        deadline = time.monotonic() + linger_ms / 1000.0
+
+        while len(self.pending) < batch_size:
+            remaining_ms = int((deadline - time.monotonic()) * 1000)
+            if remaining_ms <= 0:
+                break
+            records = self.consumer.poll(timeout_ms=remaining_ms, max_records=batch_size - len(self.pending))
+            for partition_records in records.values():
+                self.pending.extend(partition_records)
+
+        return len(self.pending)
+
+    def flush(self):
+        """Hand pending records to handle_batch, then commit their offsets."""
+        if not self.pending:
+            return
+        records, self.pending = self.pending, []
+        self.handle_batch(records)
+        if self.commit:
+            self.consumer.commit(offsets_to_commit(records))
+
+
+class StreamCommitter:
+    """
+    Commits stream-mode offsets periodically instead of after every message.
+
+    Offsets of written messages are committed with commit_async at most every
+    interval_ms, so a crash replays up to that much already-written traffic.
+    commit_pending commits synchronously; it runs before partitions are
+    revoked and on shutdown, so a clean handoff replays nothing.
+    """
+
+    def __init__(self, consumer, interval_ms=STREAM_COMMIT_INTERVAL_MS):
+        self.consumer = consumer
+        self.interval = interval_ms / 1000.0
+        self.offsets = {}
+        self.last_commit = time.monotonic()
+
+    def written(self, message):
+        """Record a message whose writes succeeded; commit if the interval has passed."""
+        tp = TopicPartition(message.topic, message.partition)
+        self.offsets[tp] = OffsetAndMetadata(message.offset + 1, None)
+        if time.monotonic() - self.last_commit >= self.interval:
+            self.consumer.commit_async(dict(self.offsets), callback=self._on_commit)
+            self.last_commit = time.monotonic()
+
+    def _on_commit(self, offsets, response):
+        if isinstance(response, Exception):
+            logger.warning(f"⚠️  Async offset commit failed: {response}")
+
+    def commit_pending(self):
+        """Synchronously commit every written offset (before a rebalance or on shutdown)."""
+        if self.offsets:
+            offsets, self.offsets = self.offsets, {}
+            self.consumer.commit(offsets)
+        self.last_commit = time.monotonic()
+
+
+class LagMonitor:
+    """Publishes consumer lag for the assigned partitions at most once per interval."""
+
+    def __init__(self, consumer, interval=REPORT_INTERVAL_S):
+        self.consumer = consumer
+        self.interval = interval
+        self.last_update = 0.0
+        self.reported = set()
+
+    def maybe_update(self):
+        if time.monotonic() - self.last_update < self.interval:
+            return
+        self.last_update = time.monotonic()
+        try:
+            assigned = self.consumer.assignment()
+            end_offsets = self.consumer.end_offsets(list(assigned)) if assigned else {}
+            for tp in assigned:
+                lag = max(end_offsets.get(tp, 0) - self.consumer.position(tp), 0)
+                CONSUMER_LAG.labels(tp.topic, str(tp.partition)).set(lag)
+            # Partitions that moved to another consumer are reported by it now
+            for tp in self.reported - assigned:
+                CONSUMER_LAG.labels(tp.topic, str(tp.partition)).set(0)
+            self.reported = set(assigned)
+        except KafkaError as e:
+            logger.warning(f"⚠️  Could not read consumer lag: {e}")
+
+
+def run_batch_loop(consumer, feature_extractor, anomaly_detector, flows_collection, anomalies_collection,
+                   batch_size=BATCH_SIZE, linger_ms=BATCH_LINGER_MS):
+    """Poll micro-batches from Kafka and score them until interrupted."""
+    totals = {"flows": 0, "anomalies": 0}
+
+    def handle_batch(records):
+        flows = decode_batch(records)
+        start = time.perf_counter()
+        alerts = process_batch(flows, feature_extractor, anomaly_detector,
+                               flows_collection, anomalies_collection)
+        elapsed = time.perf_counter() - start
+
+        totals["flows"] += len(flows)
+        totals["anomalies"] += len(alerts)
+
+        log_alerts(alerts)
+        print(f"📦 Batch: {len(flows)} flows, {len(alerts)} anomalies in {elapsed * 1000:.1f} ms "
+              f"({len(flows) / max(elapsed, 1e-9):.0f} flows/s) | total: {totals['flows']} flows, "
+              f"{totals['anomalies']} anomalies")
+
+    batcher = FlowBatcher(consumer, handle_batch)
+    lag = LagMonitor(consumer)
+    subscribe(consumer, on_revoke=batcher.flush)
+
+    while True:
+        batcher.fill(batch_size, linger_ms)
+        batcher.flush()
+        lag.maybe_update()
+
+
+def run_stream_loop(consumer, feature_extractor, anomaly_detector, flows_collection, anomalies_collection):
+    """Process flows one message at a time until interrupted."""
+    lag = LagMonitor(consumer)
+    committer = StreamCommitter(consumer) if CONSUMER_GROUP_ID else None
+    subscribe(consumer, on_revoke=committer.commit_pending if committer else None)
+    try:
+        for message in consumer:
+            flow = decode_batch([message])[0]
+            flow_doc = build_flow_doc(flow)
+            alerts = []
+
+            # Extract features
+            with STAGE_SECONDS.labels("extract").time():
+                features = feature_extractor.extract(flow)
+
+            if features is not None:
+                # Detect anomaly
+                with STAGE_SECONDS.labels("score").time():
+                    is_anomaly, score = anomaly_detector.detect(features)
+                FLOWS_SCORED.inc()
+
+                if is_anomaly:
+                    alerts.append(build_alert_doc(flow, score, anomaly_detector))
+                    ANOMALIES.inc()
+                    log_alerts(alerts)
+                elif logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"✓ Normal flow: {flow['src_ip']} -> {flow['dst_ip']}")
+
+            # Store the raw flow and any alert
+            with STAGE_SECONDS.labels("write").time():
+                flows_collection.insert_one(flow_doc)
+                if alerts:
+                    anomalies_collection.insert_one(alerts[0])
+                    increment_alert_counters(anomalies_collection.database, alert_increments(alerts))
+                write_rollups(flows_collection.database, [flow_doc], alerts)
+                track_talkers(flows_collection.database, [flow_doc])
+            lag.maybe_update()
+
+            if committer:
+                committer.written(message)
+    finally:
+        if committer:
+            try:
+                committer.commit_pending()
+            except KafkaError as e:
+                logger.warning(f"⚠️  Could not commit offsets on shutdown: {e}")
+
+
+class PoolStats:
+    """Aggregates per-batch reports from worker processes."""
+
+    def __init__(self, n_workers, interval=REPORT_INTERVAL_S):
+        self.interval = interval
+        self.flows = [0] * n_workers
+        self.anomalies = [0] * n_workers
+        self.window_flows = [0] * n_workers
+        self.window_start = time.monotonic()
+
+    def record(self, report):
+        """Add one (worker_id, n_flows, n_anomalies, elapsed, seq) report."""
+        worker_id, n_flows, n_anomalies, _, _ = report
+        self.flows[worker_id] += n_flows
+        self.anomalies[worker_id] += n_anomalies
+        self.window_flows[worker_id] += n_flows
+
+    def drain(self, stats_queue, timeout=0.0):
+        """Consume all pending reports, waiting up to timeout for the first."""
+        reports = []
+        try:
+            reports.append(stats_queue.get(timeout=timeout) if timeout else stats_queue.get_nowait())
+            while True:
+                reports.append(stats_queue.get_nowait())
+        except queue.Empty:
+            pass
+        for report in reports:
+            self.record(report)
+        return reports
+
+    def maybe_report(self):
+        """Print per-worker and total throughput once per interval."""
+        elapsed = time.monotonic() - self.window_start
+        if elapsed < self.interval:
+            return
+        rates = [n / elapsed for n in self.window_flows]
+        per_worker = ", ".join(f"w{i}: {rate:.0f}/s" for i, rate in enumerate(rates))
+        print(f"📊 Pool: {sum(rates):.0f} flows/s ({per_worker}) | total: {sum(self.flows)} flows, "
+              f"{sum(self.anomalies)} anomalies")
+        self.window_flows = [0] * len(self.window_flows)
+        self.window_start = time.monotonic()
+
+
+class OffsetTracker:
+    """
+    Tracks batches dispatched to workers so offsets are committed in order.
+
+    Workers may finish out of order; a batch's offsets become committable only
+    once it and every batch dispatched before it have been written.
+    """
+
+    def __init__(self):
+        self.next_seq = 0
+        self.low_seq = 0
+        self.inflight = {}
+        self.done = set()
+
+    def register(self, offsets):
+        """Record a dispatched batch and return its sequence number."""
+        seq = self.next_seq
+        self.next_seq += 1
+        self.inflight[seq] = offsets
+        return seq
+
+    def complete(self, seq):
+        """Mark a batch as written."""
+        self.done.add(seq)
+
+    def pop_committable(self):
+        """Merged offsets of the contiguous prefix of written batches."""
+        offsets = {}
+        while self.low_seq in self.done:
+            self.done.discard(self.low_seq)
+            offsets.update(self.inflight.pop(self.low_seq))
+            self.low_seq += 1
+        return offsets
+
+
+def _score_and_report(worker_id, flows, feature_extractor, anomaly_detector,
+                      flows_collection, anomalies_collection, stats_queue, seq=None):
+    """Process one batch inside a worker and send its stats to the parent."""
+    start = time.perf_counter()
+    alerts = process_batch(flows, feature_extractor, anomaly_detector,
+                           flows_collection, anomalies_collection)
+    stats_queue.put((worker_id, len(flows), len(alerts), time.perf_counter() - start, seq))
+    log_alerts(alerts, prefix=f"[w{worker_id}] ")
+
+
+def run_partition_worker(worker_id, n_workers, feature_extractor, anomaly_detector,
+                         stats_queue, stop_event, batch_size, linger_ms):
+    """
+    Worker that owns a subset of partitions.
+
+    With a consumer group the broker assigns partitions across workers (and
+    across other consumer nodes); without one, the worker takes every
+    partition p with p % n_workers == worker_id.
+    """
+    # The parent handles Ctrl+C and asks workers to stop between batches
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    # Mongo and Kafka clients are not fork-safe, so each worker opens its own;
+    # the parent's model watcher thread does not survive the fork either
+    db = get_database()
+    consumer = create_consumer(batch_size)
+    ModelWatcher(ModelRegistry(), anomaly_detector).start()
+    batcher = FlowBatcher(consumer, lambda records: _score_and_report(
+        worker_id, decode_batch(records), feature_extractor, anomaly_detector,
+        write_collection(db, "flows"), write_collection(db, "anomalies"), stats_queue))
+    try:
+        if CONSUMER_GROUP_ID:
+            subscribe(consumer, on_revoke=batcher.flush)
+        else:
+            partitions = sorted(consumer.partitions_for_topic(KAFKA_TOPIC) or [])
+            owned = [TopicPartition(KAFKA_TOPIC, p) for p in partitions if p % n_workers == worker_id]
+            if not owned:
+                print(f"⚠️  [w{worker_id}] No partitions to own ({len(partitions)} partitions, {n_workers} workers)")
+                return
+            consumer.assign(owned)
+            print(f"👷 [w{worker_id}] Owns partitions {[tp.partition for tp in owned]}")
+
+        lag = LagMonitor(consumer)
+        while not stop_event.is_set():
+            batcher.fill(batch_size, linger_ms)
+            batcher.flush()
+            lag.maybe_update()
+    finally:
+        flush_talkers()
+        consumer.close()
+
+
+def run_batch_worker(worker_id, feature_extractor, anomaly_detector, work_queue, stats_queue):
+    """Worker that scores raw batches handed out by the parent until it receives None."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    db = get_database()
+    ModelWatcher(ModelRegistry(), anomaly_detector).start()
+    while True:
+        item = work_queue.get()
+        if item is None:
+            flush_talkers()
+            return
+        seq, raw_values = item
+        with STAGE_SECONDS.labels("decode").time():
+            flows = [decode_flow(raw, codec) for codec, raw in raw_values]
+        FLOWS_CONSUMED.inc(len(flows))
+        _score_and_report(worker_id, flows, feature_extractor, anomaly_detector,
+                          write_collection(db, "flows"), write_collection(db, "anomalies"), stats_queue, seq=seq)
+
+
+def run_worker_pool(feature_extractor, anomaly_detector, n_workers, strategy,
+                    batch_size=BATCH_SIZE, linger_ms=BATCH_LINGER_MS):
+    """
+    Score flows with n_workers forked processes sharing the loaded model.
+
+    Workers are forked after the model is loaded, so the model's arrays are
+    shared copy-on-write instead of being unpickled once per process.
+
+    Args:
+        strategy: 'partitions' (each worker owns a subset of partitions) or
+            'batches' (the parent polls and shards raw batches across workers
+            and commits offsets once the workers have written them)
+    """
+    ctx = multiprocessing.get_context("fork")
+    # Keep the inherited model out of the cyclic GC so its pages stay shared
+    gc.freeze()
+
+    stats_queue = ctx.Queue()
+    stop_event = ctx.Event()
+    work_queue = ctx.Queue(maxsize=2 * n_workers)
+
+    if strategy == "partitions":
+        targets = [(run_partition_worker, (i, n_workers, feature_extractor, anomaly_detector,
+                                           stats_queue, stop_event, batch_size, linger_ms))
+                   for i in range(n_workers)]
+    else:
+        targets = [(run_batch_worker, (i, feature_extractor, anomaly_detector, work_queue, stats_queue))
+                   for i in range(n_workers)]
+
+    workers = [ctx.Process(target=target, args=args, name=f"consumer-worker-{i}")
+               for i, (target, args) in enumerate(targets)]
+    for worker in workers:
+        worker.start()
+
+    print(f"👷 Started {n_workers} workers ({strategy} strategy)")
+    if metrics_enabled() and not PROMETHEUS_MULTIPROC_DIR:
+        print("⚠️  Worker metrics are not exported: set PROMETHEUS_MULTIPROC_DIR to an empty directory")
+    stats = PoolStats(n_workers)
+    tracker = OffsetTracker()
+    consumer = None
+
+    def collect(timeout=0.0):
+        """Record worker reports and commit every fully written prefix of batches."""
+        for report in stats.drain(stats_queue, timeout=timeout):
+            if report[4] is not None:
+                tracker.complete(report[4])
+        offsets = tracker.pop_committable()
+        if offsets and CONSUMER_GROUP_ID:
+            consumer.commit(offsets)
+
+    def dispatch(records):
+        seq = tracker.register(offsets_to_commit(records))
+        work_queue.put((seq, [(codec_from_headers(record.headers), record.value) for record in records]))
+
+    def drain_inflight():
+        batcher.flush()
+        while tracker.inflight and any(worker.is_alive() for worker in workers):
+            collect(timeout=0.5)
+
+    try:
+        if strategy == "partitions":
+            while any(worker.is_alive() for worker in workers):
+                stats.drain(stats_queue, timeout=0.5)
+                stats.maybe_report()
+        else:
+            consumer = create_consumer(batch_size)
+            batcher = FlowBatcher(consumer, dispatch, commit=False)
+            lag = LagMonitor(consumer)
+            subscribe(consumer, on_revoke=drain_inflight)
+            while True:
+                batcher.fill(batch_size, linger_ms)
+                batcher.flush()
+                collect()
+                stats.maybe_report()
+                lag.maybe_update()
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping workers...")
+    finally:
+        stop_event.set()
+        if strategy == "batches":
+            for _ in workers:
+                try:
+                    work_queue.put(None, timeout=10)
+                except queue.Full:
+                    break
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+            mark_process_dead(worker.pid)
+        if consumer is not None:
+            collect()
+            consumer.close()
+        else:
+            stats.drain(stats_queue)
+        print(f"🛑 Consumer pool stopped. Total: {sum(stats.flows)} flows, {sum(stats.anomalies)} anomalies")
+
+
+class AsyncPipeline:
+    """
+    Three-stage asyncio ingestion pipeline.
+
+    poller -> [polled queue] -> extract+score -> [scored queue] -> Mongo writer
+
+    Kafka polling and scoring run in dedicated single-thread executors (the
+    Kafka client is not thread-safe, and scoring is CPU-bound), while writes
+    are awaited on the motor client. Both queues are bounded, so a Mongo
+    latency spike fills the scored queue, blocks the scorer and finally the
+    poller, instead of buffering without limit. Offsets are committed from the
+    Kafka thread only after the writer has stored the batch.
+    """
+
+    STAGES = ("poll", "score", "write")
+
+    def __init__(self, consumer, feature_extractor, anomaly_detector, batch_size=BATCH_SIZE,
+                 linger_ms=BATCH_LINGER_MS, queue_size=PIPELINE_QUEUE_SIZE):
+        self.consumer = consumer
+        self.feature_extractor = feature_extractor
+        self.anomaly_detector = anomaly_detector
+        self.batch_size = batch_size
+        self.linger_ms = linger_ms
+        self.queue_size = queue_size
+
+        self.kafka_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kafka")
+        self.score_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="score")
+        self.batcher = FlowBatcher(consumer, self._enqueue_polled, commit=False)
+        self.lag = LagMonitor(consumer)
+
+        self.loop = None
+        self.polled = None
+        self.scored = None
+        self.stopping = False
+
+        self.commit_lock = threading.Lock()
+        self.committable = {}
+        self.stage_stats = {stage: {"batches": 0, "seconds": 0.0, "max_seconds": 0.0} for stage in self.STAGES}
+        self.totals = {"flows": 0, "anomalies": 0}
+
+    def _record(self, stage, seconds):
+        stats = self.stage_stats[stage]
+        stats["batches"] += 1
+        stats["seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def snapshot(self):
+        """Current queue depths, per-stage latencies and totals."""
+        return {
+            "queues": {
+                "polled": self.polled.qsize() if self.polled else 0,
+                "scored": self.scored.qsize() if self.scored else 0,
+                "capacity": self.queue_size
+            },
+            "stages": {
+                stage: {
+                    "batches": stats["batches"],
+                    "avg_ms": stats["seconds"] / stats["batches"] * 1000 if stats["batches"] else 0.0,
+                    "max_ms": stats["max_seconds"] * 1000
+                }
+                for stage, stats in self.stage_stats.items()
+            },
+            "totals": dict(self.totals),
+            "mongo_pool": pool_stats().get("async")
+        }
+
+    # Kafka thread
+
+    def _wait(self, coro):
+        """Run a coroutine on the event loop from the Kafka thread, giving up on shutdown."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        while not self.stopping:
+            try:
+                return future.result(timeout=0.5)
+            except concurrent.futures.TimeoutError:
+                continue
+        future.cancel()
+
+    def _enqueue_polled(self, records):
+        # Blocks the Kafka thread while the polled queue is full (backpressure)
+        self._wait(self.polled.put(records))
+
+    def _commit_ready(self):
+        with self.commit_lock:
+            offsets, self.committable = self.committable, {}
+        if offsets and CONSUMER_GROUP_ID:
+            self.consumer.commit(offsets)
+
+    def _on_revoke(self):
+        """Push the pending batch through the pipeline and commit it before partitions move."""
+        self.batcher.flush()
+        self._wait(self._drained())
+        self._commit_ready()
+
+    def _poll_once(self):
+        self._commit_ready()
+        start = time.perf_counter()
+        if self.batcher.fill(self.batch_size, self.linger_ms):
+            self._record("poll", time.perf_counter() - start)
+            self.batcher.flush()
+        self.lag.maybe_update()
+
+    def _close(self):
+        self._commit_ready()
+        self.consumer.close()
+
+    # Event loop
+
+    async def _drained(self):
+        await self.polled.join()
+        await self.scored.join()
+
+    async def _poller(self):
+        await self.loop.run_in_executor(self.kafka_executor, subscribe, self.consumer, self._on_revoke)
+        while True:
+            await self.loop.run_in_executor(self.kafka_executor, self._poll_once)
+
+    def _decode_and_score(self, records):
+        flows = decode_batch(records)
+        return score_batch(flows, self.feature_extractor, self.anomaly_detector)
+
+    async def _scorer(self):
+        while True:
+            records = await self.polled.get()
+            start = time.perf_counter()
+            flow_docs, alerts = await self.loop.run_in_executor(self.score_executor, self._decode_and_score, records)
+            self._record("score", time.perf_counter() - start)
+            await self.scored.put((records, flow_docs, alerts))
+            self.polled.task_done()
+
+    async def _writer(self, db):
+        # The top talkers tracker persists with pymongo, so it runs off the event loop
+        sync_db = get_database()
+        while True:
+            records, flow_docs, alerts = await self.scored.get()
+            start = time.perf_counter()
+            await write_collection(db, "flows").insert_many(flow_docs, ordered=False)
+            if alerts:
+                await write_collection(db, "anomalies").insert_many(alerts, ordered=False)
+                await increment_alert_counters_async(db, alert_increments(alerts))
+            await write_rollups_async(db, flow_docs, alerts)
+            await self.loop.run_in_executor(None, track_talkers, sync_db, flow_docs)
+            self._record("write", time.perf_counter() - start)
+            STAGE_SECONDS.labels("write").observe(time.perf_counter() - start)
+
+            with self.commit_lock:
+                self.committable.update(offsets_to_commit(records))
+            self.totals["flows"] += len(flow_docs)
+            self.totals["anomalies"] += len(alerts)
+            log_alerts(alerts)
+            self.scored.task_done()
+
+    async def _reporter(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL_S)
+            snapshot = self.snapshot()
+            queues = snapshot["queues"]
+            stages = " ".join(f"{stage} {stats['avg_ms']:.1f}/{stats['max_ms']:.1f}ms"
+                              for stage, stats in snapshot["stages"].items())
+            print(f"⏱️  Pipeline: queues polled {queues['polled']}/{queues['capacity']} "
+                  f"scored {queues['scored']}/{queues['capacity']} | avg/max {stages} | "
+                  f"total: {snapshot['totals']['flows']} flows, {snapshot['totals']['anomalies']} anomalies")
+            pool = snapshot["mongo_pool"]
+            if pool:
+                print(f"🔌 Mongo pool: {pool['in_use']}/{pool['max_pool_size']} in use (max {pool['max_in_use']}), "
+                      f"checkout wait p50/p99 {pool['wait_ms']['p50']:.2f}/{pool['wait_ms']['p99']:.2f}ms")
+
+    async def run(self):
+        """Run all stages until cancelled."""
+        self.loop = asyncio.get_running_loop()
+        self.polled = asyncio.Queue(maxsize=self.queue_size)
+        self.scored = asyncio.Queue(maxsize=self.queue_size)
+        db = get_async_database()
+
+        tasks = [
+            asyncio.create_task(self._poller()),
+            asyncio.create_task(self._scorer()),
+            asyncio.create_task(self._writer(db)),
+            asyncio.create_task(self._reporter())
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.stopping = True
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Runs after any in-progress poll on the single Kafka thread
+            await self.loop.run_in_executor(self.kafka_executor, self._close)
+            await self.loop.run_in_executor(None, flush_talkers)
+            self.kafka_executor.shutdown(wait=False)
+            self.score_executor.shutdown(wait=False)
+
+
+def load_detector(registry):
+    """Load the registry's active model, or IFOREST_MODEL_PATH while the registry is empty."""
+    if registry.current_version() is not None:
+        anomaly_detector = registry.load(model_type=MODEL_TYPE)
+        print(f"✅ Loaded model {anomaly_detector.version} from registry {registry.root}")
+    else:
+        anomaly_detector = AnomalyDetector(model_type=MODEL_TYPE)
+        anomaly_detector.load_model(IFOREST_MODEL_PATH)
+        print(f"✅ Loaded unversioned model from {IFOREST_MODEL_PATH}")
+    return anomaly_detector
+
+
+def positive_int(value):
+    """argparse type for options that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def parse_args():
+    """Parse consumer command line options."""
+    parser = argparse.ArgumentParser(description="Score network flows from Kafka")
+    parser.add_argument(
+        "--mode",
+        choices=["batch", "async", "stream"],
+        default=CONSUMER_MODE,
+        help="batch: micro-batched scoring and bulk writes; async: asyncio pipeline with "
+             "motor writes; stream: one message at a time"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=positive_int,
+        default=BATCH_SIZE,
+        help="Maximum flows per micro-batch (default: CONSUMER_BATCH_SIZE or 500)"
+    )
+    parser.add_argument(
+        "--linger-ms",
+        type=positive_int,
+        default=BATCH_LINGER_MS,
+        help="Maximum time to wait for a batch to fill (default: CONSUMER_BATCH_LINGER_MS or 200)"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=CONSUMER_WORKERS,
+        help="Number of scoring processes in batch mode (default: CONSUMER_WORKERS or 1)"
+    )
+    parser.add_argument(
+        "--pool-strategy",
+        choices=["partitions", "batches"],
+        default=POOL_STRATEGY,
+        help="partitions: workers own Kafka partitions; batches: parent polls and shards batches"
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=positive_int,
+        default=PIPELINE_QUEUE_SIZE,
+        help="Batches buffered between async pipeline stages (default: CONSUMER_PIPELINE_QUEUE_SIZE or 8)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=METRICS_PORT,
+        help="Port serving Prometheus /metrics, 0 to disable (default: METRICS_PORT or 9108)"
+    )
+    parser.add_argument(
+        "--log-level",
+        default=LOG_LEVEL,
+        help="DEBUG logs every anomaly and, in stream mode, every flow (default: CONSUMER_LOG_LEVEL or INFO)"
+    )
+    args = parser.parse_args()
+    # Defaults read from the environment bypass the argparse type check
+    for option in ("batch_size", "linger_ms", "queue_size"):
+        if getattr(args, option) < 1:
+            parser.error(f"--{option.replace('_', '-')} must be at least 1, got {getattr(args, option)}")
+    return args
 
 
 def main():
     """Main consumer loop that processes flows through ML pipeline."""
+    args = parse_args()
+    logging.basicConfig(level=args.log_level.upper(), format="%(message)s")
+    start_metrics_server(args.metrics_port)
+
     # Initialize components
     feature_extractor = FeatureExtractor()
-    anomaly_detector = AnomalyDetector()
-    
+    registry = ModelRegistry()
+
     # Load trained model
     try:
-        anomaly_detector.load_model(IFOREST_MODEL_PATH)
-        print(f"✅ Loaded model from {IFOREST_MODEL_PATH}")
+        anomaly_detector = load_detector(registry)
     except Exception as e:
         print(f"⚠️  Could not load model: {e}")
         print("📝 Please train a model first using: python scripts/train_iforest.py")
         return
-    
+
+    # Idempotent; makes sure a fresh database gets the API's indexes before data lands
+    ensure_indexes(get_database())
+
+    if args.mode == "batch" and args.workers > 1:
+        if "fork" not in multiprocessing.get_all_start_methods():
+            print("⚠️  Worker pool needs the fork start method; running a single process")
+        else:
+            run_worker_pool(feature_extractor, anomaly_detector, args.workers, args.pool_strategy,
+                            batch_size=args.batch_size, linger_ms=args.linger_ms)
+            return
+
+    ModelWatcher(registry, anomaly_detector).start()
+
+    if args.mode == "async":
+        pipeline = AsyncPipeline(create_consumer(args.batch_size), feature_extractor, anomaly_detector,
+                                 batch_size=args.batch_size, linger_ms=args.linger_ms,
+                                 queue_size=args.queue_size)
+        print(f"🎯 Async pipeline started. Listening to topic: {KAFKA_TOPIC}")
+        print(f"📦 Batches of up to {args.batch_size} flows, stage queues of {args.queue_size}\n")
+        try:
+            asyncio.run(pipeline.run())
+        except KeyboardInterrupt:
+            print("\n🛑 Consumer stopped.")
+        return
+
     # Connect to MongoDB
     db = get_database()
-    anomalies_collection = db["anomalies"]
-    flows_collection = db["flows"]
-    
+    anomalies_collection = write_collection(db, "anomalies")
+    flows_collection = write_collection(db, "flows")
+
     # Create Kafka consumer
-    consumer = KafkaConsumer(
-        KAFKA_TOPIC,
-        bootstrap_servers=KAFKA_BROKER,
-        value_deserializer=lambda m: json.loads(m.decode('utf-8')),
-        auto_offset_reset='latest',
-        enable_auto_commit=True
-    )
-    
+    consumer = create_consumer(args.batch_size)
+
     print(f"🎯 Kafka consumer started. Listening to topic: {KAFKA_TOPIC}")
     print(f"📡 Broker: {KAFKA_BROKER}")
+    if CONSUMER_GROUP_ID:
+        print(f"👥 Consumer group: {CONSUMER_GROUP_ID}")
+    if args.mode == "batch":
+        print(f"📦 Batch mode: up to {args.batch_size} flows, linger {args.linger_ms} ms")
     print("🔄 Processing flows through ML pipeline...\n")
-    
+
     try:
-        for message in consumer:
-            flow = message.value
-            
-            # Store raw flow
-            flow_doc = {
-                "timestamp": flow.get("timestamp"),
-                "src_ip": flow.get("src_ip"),
-                "dst_ip": flow.get("dst_ip"),
-                "protocol": flow.get("protocol"),
-                "bytes": flow.get("bytes"),
-                "packets": flow.get("packets"),
-                "duration": flow.get("duration"),
-                "src_port": flow.get("src_port"),
-                "dst_port": flow.get("dst_port")
-            }
-            flows_collection.insert_one(flow_doc)
-            
-            # Extract features
-            features = feature_extractor.extract(flow)
-            
-            if features is not None:
-                # Detect anomaly
-                is_anomaly, score = anomaly_detector.detect(features)
-                
-                if is_anomaly:
-                    # Store anomaly alert
-                    alert = {
-                        "timestamp": flow.get("timestamp"),
-                        "src_ip": flow.get("src_ip"),
-                        "dst_ip": flow.get("dst_ip"),
-                        "protocol": flow.get("protocol"),
-                        "score": float(score),
-                        "model": "isolation_forest",
-                        "features": {
-                            "bytes": flow.get("bytes"),
-                            "packets": flow.get("packets"),
-                            "duration": flow.get("duration")
-                        },
-                        "status": "new"
-                    }
-                    anomalies_collection.insert_one(alert)
-                    print(f"🚨 ANOMALY DETECTED: {flow['src_ip']} -> {flow['dst_ip']} (score: {score:.4f})")
-                else:
-                    print(f"✓ Normal flow: {flow['src_ip']} -> {flow['dst_ip']}")
-            
+        if args.mode == "batch":
+            run_batch_loop(consumer, feature_extractor, anomaly_detector,
+                           flows_collection, anomalies_collection,
+                           batch_size=args.batch_size, linger_ms=args.linger_ms)
+        else:
+            run_stream_loop(consumer, feature_extractor, anomaly_detector,
+                            flows_collection, anomalies_collection)
     except KeyboardInterrupt:
         print("\n🛑 Consumer stopped.")
     finally:
+        flush_talkers()
         consumer.close()
 
 
 if __name__ == "__main__":
     main()
-
@@ -1,47 +1,265 @@
 """Kafka producer for simulating network flow events."""
 from kafka import KafkaProducer
+import argparse
 import json
 import time
 import random
 import os
+import sys
 from dotenv import load_dotenv
 
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.codec import encode_flow, codec_headers, FLOW_CODEC
+
 load_dotenv()
 
 KAFKA_BROKER = os.getenv("KAFKA_BROKER", "localhost:9092")
 KAFKA_TOPIC = os.getenv("KAFKA_TOPIC", "network_flows")
 
+# Injected attacks come from their own range so alerts can be matched to ground truth
+ATTACKER_SUBNET = "10.66.0"
+ATTACK_SHAPES = ("burst", "portscan", "exfil")
+
 
-def generate_flow():
+def generate_flow(rng=random, timestamp=None):
     """Generate a simulated network flow event."""
     return {
-        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ"),
-        "src_ip": f"10.10.0.{random.randint(1, 50)}",
-        "dst_ip": f"10.20.0.{random.randint(1, 50)}",
-        "protocol": random.choice(["TCP", "UDP", "ICMP"]),
-        "bytes": random.randint(500, 100000),
-        "packets": random.randint(1, 200),
-        "duration": round(random.random() * 5, 2),
-        "src_port": random.randint(1024, 65535),
-        "dst_port": random.randint(1, 65535)
+        "timestamp": timestamp or time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "src_ip": f"10.10.0.{rng.randint(1, 50)}",
+        "dst_ip": f"10.20.0.{rng.randint(1, 50)}",
+        "protocol": rng.choice(["TCP", "UDP", "ICMP"]),
+        "bytes": rng.randint(500, 100000),
+        "packets": rng.randint(1, 200),
+        "duration": round(rng.random() * 5, 2),
+        "src_port": rng.randint(1024, 65535),
+        "dst_port": rng.randint(1, 65535)
     }
 
 
+def generate_attack(shape, rng, timestamp):
+    """
+    Generate the flows of one injected attack.
+
+    burst: back-to-back high-volume, very short flows between one pair of hosts
+    portscan: one tiny probe per destination port from a single source
+    exfil: one very large, long-lived outbound transfer
+    """
+    src_ip = f"{ATTACKER_SUBNET}.{rng.randint(1, 50)}"
+    dst_ip = f"10.20.0.{rng.randint(1, 50)}"
+
+    if shape == "burst":
+        return [
+            {
+                "timestamp": timestamp,
+                "src_ip": src_ip,
+                "dst_ip": dst_ip,
+                "protocol": rng.choice(["TCP", "UDP"]),
+                "bytes": rng.randint(200000, 600000),
+                "packets": rng.randint(200, 1000),
+                "duration": round(rng.random() * 0.1, 3),
+                "src_port": rng.randint(1024, 65535),
+                "dst_port": rng.choice([80, 443, 53])
+            }
+            for _ in range(rng.randint(20, 80))
+        ]
+
+    if shape == "portscan":
+        first_port = rng.randint(1, 60000)
+        return [
+            {
+                "timestamp": timestamp,
+                "src_ip": src_ip,
+                "dst_ip": dst_ip,
+                "protocol": "TCP",
+                "bytes": rng.randint(40, 120),
+                "packets": rng.randint(1, 2),
+                "duration": round(rng.random() * 0.01, 4),
+                "src_port": rng.randint(1024, 65535),
+                "dst_port": first_port + offset
+            }
+            for offset in range(rng.randint(50, 200))
+        ]
+
+    if shape == "exfil":
+        return [{
+            "timestamp": timestamp,
+            "src_ip": src_ip,
+            "dst_ip": f"203.0.113.{rng.randint(1, 254)}",
+            "protocol": "TCP",
+            "bytes": rng.randint(2_000_000, 20_000_000),
+            "packets": rng.randint(1500, 15000),
+            "duration": round(rng.random() * 2 + 10, 2),
+            "src_port": rng.randint(1024, 65535),
+            "dst_port": 443
+        }]
+
+    raise ValueError(f"Unknown attack shape: {shape}")
+
+
+# Mean flows per attack, used to turn a flow-level anomaly ratio into an attack start rate
+MEAN_ATTACK_FLOWS = {"burst": 50, "portscan": 125, "exfil": 1}
+
+
+class LoadGenerator:
+    """Produces normal flows with a configurable share of injected attack flows."""
+
+    def __init__(self, seed=None, anomaly_ratio=0.0, attacks=ATTACK_SHAPES):
+        self.rng = random.Random(seed)
+        self.anomaly_ratio = anomaly_ratio
+        self.attacks = list(attacks)
+        mean_length = sum(MEAN_ATTACK_FLOWS[shape] for shape in self.attacks) / len(self.attacks) \
+            if self.attacks else 1
+        self.attack_start_probability = anomaly_ratio / mean_length
+        self.pending = []
+        self.attack_id = 0
+
+    def next_flow(self, timestamp):
+        """
+        Return (flow, attack) where attack is None for normal traffic or
+        {"attack": shape, "attack_id": n} for injected flows.
+        """
+        if not self.pending and self.attacks and self.rng.random() < self.attack_start_probability:
+            shape = self.rng.choice(self.attacks)
+            self.attack_id += 1
+            self.pending = [(flow, {"attack": shape, "attack_id": self.attack_id})
+                            for flow in generate_attack(shape, self.rng, timestamp)]
+            self.pending.reverse()
+
+        if self.pending:
+            flow, attack = self.pending.pop()
+            flow["timestamp"] = timestamp
+            return flow, attack
+        return generate_flow(self.rng, timestamp), None
+
+
+def run_load(producer, rate, total=None, run_seconds=None, seed=None, anomaly_ratio=0.0,
+             attacks=ATTACK_SHAPES, ground_truth_path=None, report_interval=5.0):
+    """
+    Send flows at a target rate until total flows or run_seconds is reached.
+
+    Sending is paced in small ticks against a monotonic clock, so the target
+    rate holds on average even when individual sends are slow.
+    """
+    generator = LoadGenerator(seed=seed, anomaly_ratio=anomaly_ratio, attacks=attacks)
+    ground_truth = open(ground_truth_path, "a") if ground_truth_path else None
+    errors = []
+
+    sent = injected = 0
+    start = last_report = time.monotonic()
+    last_report_sent = 0
+
+    try:
+        while (total is None or sent < total) and \
+                (run_seconds is None or time.monotonic() - start < run_seconds):
+            now = time.monotonic()
+            due = int((now - start) * rate) - sent
+            if total is not None:
+                due = min(due, total - sent)
+            if due <= 0:
+                time.sleep(min(0.001, 1.0 / rate))
+                continue
+
+            timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+            for _ in range(due):
+                flow, attack = generator.next_flow(timestamp)
+                payload, codec = encode_flow(flow)
+                producer.send(KAFKA_TOPIC, value=payload, headers=codec_headers(codec)) \
+                    .add_errback(errors.append)
+                if attack is not None:
+                    injected += 1
+                    if ground_truth is not None:
+                        ground_truth.write(json.dumps({**flow, **attack, "sent_at": time.time()}) + "\n")
+            sent += due
+
+            if now - last_report >= report_interval:
+                print(f"📈 Sent {sent} flows ({injected} injected) | "
+                      f"{(sent - last_report_sent) / (now - last_report):.0f} flows/s "
+                      f"(target {rate:.0f}) | errors: {len(errors)}")
+                last_report, last_report_sent = now, sent
+    finally:
+        producer.flush()
+        elapsed = time.monotonic() - start
+        if ground_truth is not None:
+            ground_truth.close()
+        print(f"\n✅ Load run finished: {sent} flows in {elapsed:.1f}s "
+              f"({sent / max(elapsed, 1e-9):.0f} flows/s achieved, target {rate:.0f})")
+        print(f"🧪 Injected {injected} attack flows from {generator.attack_id} attacks "
+              f"({injected / max(sent, 1):.2%} of traffic), send errors: {len(errors)}")
+        if ground_truth_path:
+            print(f"📝 Ground truth appended to {ground_truth_path}")
+
+
+def positive_float(value):
+    """argparse type for options that must be a finite number greater than 0."""
+    number = float(value)
+    if not 0 < number < float("inf"):
+        raise argparse.ArgumentTypeError(f"must be a finite number greater than 0, got {value}")
+    return number
+
+
+def parse_args():
+    """Parse producer command line options."""
+    parser = argparse.ArgumentParser(description="Simulate network flows into Kafka")
+    parser.add_argument("--rate", type=positive_float, default=None,
+                        help="Load-generation mode: target flows/sec (default: one flow every 0.5s)")
+    parser.add_argument("--count", type=int, default=None, help="Stop after this many flows")
+    parser.add_argument("--seconds", type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible traffic")
+    parser.add_argument("--anomaly-ratio", type=float, default=0.0,
+                        help="Fraction of flows that belong to injected attacks (e.g. 0.02)")
+    parser.add_argument("--attacks", type=str, default=",".join(ATTACK_SHAPES),
+                        help=f"Comma-separated attack shapes to inject ({', '.join(ATTACK_SHAPES)})")
+    parser.add_argument("--ground-truth", type=str, default=None,
+                        help="JSONL file receiving every injected flow with its send time")
+    parser.add_argument("--batch-size", type=int, default=65536, help="Producer batch size in bytes")
+    parser.add_argument("--linger-ms", type=int, default=20, help="Producer linger before sending a batch")
+    parser.add_argument("--compression", choices=["none", "gzip", "snappy", "lz4", "zstd"], default="none",
+                        help="Producer compression codec")
+    parser.add_argument("--acks", choices=["0", "1", "all"], default="1", help="Producer acknowledgements")
+    args = parser.parse_args()
+
+    args.attacks = [shape.strip() for shape in args.attacks.split(",") if shape.strip()]
+    unknown = set(args.attacks) - set(ATTACK_SHAPES)
+    if unknown:
+        parser.error(f"Unknown attack shapes: {', '.join(sorted(unknown))}")
+    return args
+
+
 def main():
     """Main producer loop."""
-    producer = KafkaProducer(
-        bootstrap_servers=KAFKA_BROKER,
-        value_serializer=lambda v: json.dumps(v).encode('utf-8')
-    )
-    
+    args = parse_args()
+
+    if args.rate is None:
+        producer = KafkaProducer(bootstrap_servers=KAFKA_BROKER)
+    else:
+        producer = KafkaProducer(
+            bootstrap_servers=KAFKA_BROKER,
+            batch_size=args.batch_size,
+            linger_ms=args.linger_ms,
+            compression_type=None if args.compression == "none" else args.compression,
+            acks=args.acks if args.acks == "all" else int(args.acks)
+        )
+
     print(f"🚀 Kafka producer started. Sending to topic: {KAFKA_TOPIC}")
+    print(f"📦 Wire codec: {FLOW_CODEC}")
     print(f"📡 Broker: {KAFKA_BROKER}")
     print("Press Ctrl+C to stop...\n")
-    
+
     try:
+        if args.rate is not None:
+            print(f"🏋️  Load mode: {args.rate:.0f} flows/s, anomaly ratio {args.anomaly_ratio}, "
+                  f"attacks {args.attacks}, seed {args.seed}, compression {args.compression}")
+            run_load(producer, args.rate, total=args.count, run_seconds=args.seconds, seed=args.seed,
+                     anomaly_ratio=args.anomaly_ratio, attacks=args.attacks,
+                     ground_truth_path=args.ground_truth)
+            return
+
         while True:
             flow = generate_flow()
-            producer.send(KAFKA_TOPIC, flow)
+            payload, codec = encode_flow(flow)
+            producer.send(KAFKA_TOPIC, value=payload, headers=codec_headers(codec))
             print(f"✅ Sent: {flow['src_ip']} -> {flow['dst_ip']} ({flow['bytes']} bytes)")
             time.sleep(0.5)
     except KeyboardInterrupt:
@@ -52,4 +270,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
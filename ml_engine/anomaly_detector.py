@@ -2,6 +2,9 @@
 import numpy as np
 import joblib
 import os
+import threading
+from sklearn.ensemble import IsolationForest
+from ml_engine.forest_engine import CompiledIsolationForest
 
 
 class AnomalyDetector:
@@ -12,11 +15,18 @@ class AnomalyDetector:
         Initialize anomaly detector.
         
         Args:
-            model_type: Type of model ('isolation_forest', 'dbscan', 'autoencoder')
+            model_type: Type of model ('isolation_forest', 'isolation_forest_compiled',
+                'dbscan', 'autoencoder'). 'isolation_forest_compiled' loads an
+                Isolation Forest and scores it with the flattened-array engine.
         """
         self.model_type = model_type
         self.model = None
         self.is_fitted = False
+        # Registry version of the loaded model (None for a plain model file)
+        self.version = None
+        self.metadata = {}
+        self._staged = None
+        self._staged_lock = threading.Lock()
     
     def load_model(self, model_path):
         """
@@ -28,37 +38,87 @@ class AnomalyDetector:
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found: {model_path}")
         
-        self.model = joblib.load(model_path)
+        model = joblib.load(model_path)
+        if self.model_type == "isolation_forest_compiled":
+            model = CompiledIsolationForest.from_sklearn(model)
+        
+        self.model = model
         self.is_fitted = True
         print(f"✅ Model loaded from {model_path}")
     
-    def detect(self, X):
+    def stage_update(self, other):
         """
-        Detect anomalies in feature vectors.
+        Stage another loaded detector's model to replace this one.
+        
+        Safe to call from a background thread: the swap itself happens at the
+        start of the next detect/detect_batch call, so a batch is always
+        scored by a single model and scoring never waits on a model load.
+        
+        Args:
+            other: AnomalyDetector with a loaded model
+        """
+        with self._staged_lock:
+            self._staged = (other.model, other.version, other.metadata)
+    
+    def _apply_staged(self):
+        if self._staged is None:
+            return
+        with self._staged_lock:
+            staged, self._staged = self._staged, None
+        previous = self.version
+        self.model, self.version, self.metadata = staged
+        self.is_fitted = True
+        print(f"🔁 Swapped model {previous or 'unversioned'} -> {self.version}")
+    
+    def predict_and_score(self, X):
+        """
+        Compute anomaly flags and decision scores in a single model pass.
+        
+        For an IsolationForest, predict() is defined as decision_function(X) < 0
+        (the fitted offset_ is already subtracted), so the flags are derived from
+        one decision_function call instead of walking every tree twice. Other
+        models fall back to separate predict and scoring calls.
         
         Args:
             X: Feature array (n_samples, n_features)
             
         Returns:
-            tuple: (is_anomaly: bool, score: float)
+            tuple: (is_anomalies: bool array, scores: array)
         """
+        self._apply_staged()
         if self.model is None or not self.is_fitted:
             raise ValueError("Model not loaded or not fitted")
         
-        # Predict anomaly
-        prediction = self.model.predict(X)
-        is_anomaly = prediction[0] == -1  # Isolation Forest: -1 is anomaly
+        if isinstance(self.model, (IsolationForest, CompiledIsolationForest)):
+            scores = self.model.decision_function(X)
+            return scores < 0, scores
+        
+        is_anomalies = self.model.predict(X) == -1
         
-        # Get anomaly score
         if hasattr(self.model, 'decision_function'):
-            score = self.model.decision_function(X)[0]
+            scores = self.model.decision_function(X)
         elif hasattr(self.model, 'score_samples'):
-            score = self.model.score_samples(X)[0]
+            scores = self.model.score_samples(X)
         else:
-            score = 0.0
+            scores = np.zeros(len(X))
+        
+        return is_anomalies, scores
+    
+    def detect(self, X):
+        """
+        Detect anomalies in feature vectors.
+        
+        Args:
+            X: Feature array (n_samples, n_features)
+            
+        Returns:
+            tuple: (is_anomaly: bool, score: float)
+        """
+        is_anomalies, scores = self.predict_and_score(X)
+        is_anomaly = is_anomalies[0]
         
         # Normalize score (lower is more anomalous)
-        normalized_score = abs(score) if is_anomaly else 0.0
+        normalized_score = abs(scores[0]) if is_anomaly else 0.0
         
         return is_anomaly, normalized_score
     
@@ -72,18 +132,4 @@ class AnomalyDetector:
         Returns:
             tuple: (predictions: array, scores: array)
         """
-        if self.model is None or not self.is_fitted:
-            raise ValueError("Model not loaded or not fitted")
-        
-        predictions = self.model.predict(X)
-        is_anomalies = predictions == -1
-        
-        if hasattr(self.model, 'decision_function'):
-            scores = self.model.decision_function(X)
-        elif hasattr(self.model, 'score_samples'):
-            scores = self.model.score_samples(X)
-        else:
-            scores = np.zeros(len(X))
-        
-        return is_anomalies, scores
-
+        return self.predict_and_score(X)
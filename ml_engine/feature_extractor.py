@@ -1,5 +1,8 @@
 """Feature extraction from network flow data."""
+import hashlib
+import json
 import numpy as np
+from numbers import Real
 
 
 class FeatureExtractor:
@@ -53,23 +56,127 @@ class FeatureExtractor:
             print(f"Error extracting features: {e}")
             return None
     
-    def extract_batch(self, flows):
+    def extract_batch(self, flows, return_indices=False):
         """
-        Extract features from multiple flows.
+        Extract features from multiple flows using columnar NumPy operations.
+        
+        Produces the same values as calling extract() on every flow: missing
+        fields take the same defaults, unknown protocols map to 0, and flows
+        with non-numeric bytes/packets/duration/ports are skipped.
         
         Args:
-            flows: List of flow dictionaries
+            flows: pandas DataFrame, dict of column arrays, or list of flow dictionaries
+            return_indices: Also return the positions of flows that were extracted
             
         Returns:
-            numpy array of features (n_samples, n_features)
+            numpy array of features (n_samples, n_features), or a tuple
+            (features, valid_indices) when return_indices is True
         """
-        feature_list = []
-        for flow in flows:
-            features = self.extract(flow)
-            if features is not None:
-                feature_list.append(features[0])
+        columns, n = self._columns(flows)
+        valid = np.ones(n, dtype=bool)
+        
+        numeric = {}
+        for name in ("bytes", "packets", "duration", "src_port", "dst_port"):
+            numeric[name], ok = _numeric_column(columns.get(name), n, FIELD_DEFAULTS[name])
+            valid &= ok
+        
+        bytes_ = numeric["bytes"]
+        packets = numeric["packets"]
+        duration = numeric["duration"]
+        protocol = self._encode_protocols(columns.get("protocol"), n)
+        
+        X = np.empty((n, 8), dtype=float)
+        X[:, 0] = bytes_
+        X[:, 1] = packets
+        X[:, 2] = duration
+        X[:, 3] = protocol
+        X[:, 4] = bytes_ / np.maximum(packets, 1)
+        X[:, 5] = numeric["src_port"] / 65535.0
+        X[:, 6] = numeric["dst_port"] / 65535.0
+        X[:, 7] = bytes_ / np.maximum(duration, 0.1)
+        
+        valid_indices = np.flatnonzero(valid)
+        if len(valid_indices) < n:
+            print(f"Error extracting features: skipped {n - len(valid_indices)} flows with non-numeric fields")
+            X = X[valid_indices]
+        
+        if len(valid_indices) == 0:
+            X = None
+        if return_indices:
+            return X, valid_indices
+        return X
+    
+    @staticmethod
+    def _columns(flows):
+        """Normalize supported batch inputs to a dict of columns and a row count."""
+        if hasattr(flows, "columns") and hasattr(flows, "to_numpy"):
+            # pandas DataFrame
+            return {name: flows[name].to_numpy() for name in FLOW_FIELDS if name in flows.columns}, len(flows)
+        
+        if isinstance(flows, dict):
+            columns = {name: flows[name] for name in FLOW_FIELDS if name in flows}
+            n = len(next(iter(columns.values()))) if columns else 0
+            return columns, n
+        
+        flows = list(flows)
+        columns = {}
+        for name in FLOW_FIELDS:
+            if any(name in flow for flow in flows):
+                default = FIELD_DEFAULTS[name]
+                columns[name] = [flow.get(name, default) for flow in flows]
+        return columns, len(flows)
+    
+    def _encode_protocols(self, values, n):
+        """Map protocol names to codes with a lookup table (unknown -> 0)."""
+        codes = np.zeros(n, dtype=float)
+        if values is None:
+            codes[:] = self.protocol_map["TCP"]
+            return codes
         
-        if len(feature_list) > 0:
-            return np.array(feature_list)
-        return None
+        values = np.asarray(values)
+        if values.dtype.kind not in "OUS":
+            return codes
+        for name, code in self.protocol_map.items():
+            codes[values == name] = code
+        return codes
 
+
+FLOW_FIELDS = ("bytes", "packets", "duration", "protocol", "src_port", "dst_port")
+FIELD_DEFAULTS = {"bytes": 0, "packets": 0, "duration": 0, "protocol": "TCP", "src_port": 0, "dst_port": 0}
+
+# Columns produced by extract/extract_batch, in order. Bump FEATURE_SCHEMA_VERSION
+# whenever a feature's definition changes so models trained on the old one are rejected.
+FEATURE_NAMES = ("bytes", "packets", "duration", "protocol", "bytes_per_packet",
+                 "src_port_norm", "dst_port_norm", "flow_rate")
+FEATURE_SCHEMA_VERSION = 1
+
+
+def feature_schema_hash():
+    """Short hash identifying the feature layout a model was trained on."""
+    schema = json.dumps({"version": FEATURE_SCHEMA_VERSION, "features": FEATURE_NAMES})
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+def _numeric_column(values, n, default):
+    """
+    Convert one flow field to a float array.
+    
+    Returns:
+        tuple: (values, valid) where valid marks entries that are real numbers
+    """
+    if values is None:
+        return np.full(n, float(default)), np.ones(n, dtype=bool)
+    
+    array = np.asarray(values)
+    if array.dtype.kind in "biuf":
+        return array.astype(float, copy=False), np.ones(n, dtype=bool)
+    if array.dtype.kind != "O":
+        # NumPy coerces mixed lists to strings; keep the original objects
+        array = np.array(values, dtype=object)
+    values = array
+    
+    # Mixed or string column: only real numbers are usable, like the scalar path
+    valid = np.fromiter((isinstance(v, Real) for v in values), dtype=bool, count=n)
+    out = np.full(n, np.nan)
+    out[valid] = values[valid].astype(float)
+    return out, valid
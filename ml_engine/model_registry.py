@@ -0,0 +1,227 @@
+"""Versioned model registry with live reload for the scoring consumers."""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import joblib
+from dotenv import load_dotenv
+from ml_engine.anomaly_detector import AnomalyDetector
+from ml_engine.feature_extractor import FEATURE_NAMES, feature_schema_hash
+
+load_dotenv()
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "ml_engine/models/registry")
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "10"))
+
+ARTIFACT_NAME = "model.pkl"
+METADATA_NAME = "metadata.json"
+# Holds the active version name; replaced atomically on activation
+CURRENT_POINTER = "CURRENT"
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_safe(values):
+    """Keep only JSON-serializable scalars (drops prediction arrays and estimators)."""
+    safe = {}
+    for key, value in (values or {}).items():
+        if hasattr(value, "item") and getattr(value, "ndim", None) == 0:
+            value = value.item()
+        if value is None or isinstance(value, (bool, int, float, str)):
+            safe[key] = value
+    return safe
+
+
+class ModelRegistry:
+    """
+    Directory of immutable, versioned model artifacts.
+
+    Layout:
+        <root>/v0001/model.pkl
+        <root>/v0001/metadata.json
+        <root>/CURRENT          (name of the active version)
+
+    A version directory is fully written under a temporary name and renamed
+    into place, and CURRENT is swapped with os.replace, so readers never see
+    a partially published model.
+    """
+
+    def __init__(self, root=MODEL_REGISTRY_DIR):
+        self.root = root
+
+    def versions(self):
+        """Published version names, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if name.startswith("v") and name[1:].isdigit()
+            and os.path.exists(os.path.join(self.root, name, METADATA_NAME))
+        )
+
+    def current_version(self):
+        """Active version, falling back to the newest one when CURRENT is missing."""
+        try:
+            with open(os.path.join(self.root, CURRENT_POINTER)) as f:
+                version = f.read().strip()
+            if version:
+                return version
+        except FileNotFoundError:
+            pass
+        versions = self.versions()
+        return versions[-1] if versions else None
+
+    def metadata(self, version):
+        """Metadata dictionary of a published version."""
+        with open(os.path.join(self.root, version, METADATA_NAME)) as f:
+            return json.load(f)
+
+    def publish(self, model, model_type="isolation_forest", params=None, metrics=None, activate=True):
+        """
+        Store a trained model as a new version.
+
+        Args:
+            model: Fitted model
+            model_type: Model family recorded in the metadata and on alerts
+            params: Training hyperparameters
+            metrics: Evaluation metrics (non-scalar values are dropped)
+            activate: Point CURRENT at the new version
+
+        Returns:
+            str: The new version name
+        """
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.root)
+        try:
+            artifact_path = os.path.join(staging, ARTIFACT_NAME)
+            joblib.dump(model, artifact_path)
+            metadata = {
+                "model_type": model_type,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "params": _json_safe(params),
+                "metrics": _json_safe(metrics),
+                "features": list(FEATURE_NAMES),
+                "feature_schema_hash": feature_schema_hash(),
+                "artifact_sha256": _file_sha256(artifact_path)
+            }
+
+            # Another trainer may claim the same number; retry with the next one
+            while True:
+                versions = self.versions()
+                version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+                metadata["version"] = version
+                with open(os.path.join(staging, METADATA_NAME), "w") as f:
+                    json.dump(metadata, f, indent=2)
+                try:
+                    os.rename(staging, os.path.join(self.root, version))
+                    break
+                except OSError:
+                    if not os.path.isdir(os.path.join(self.root, version)):
+                        raise
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        print(f"📦 Registered model {version} in {self.root}")
+        if activate:
+            self.activate(version)
+        return version
+
+    def activate(self, version):
+        """Make version the one consumers load (also used to roll back)."""
+        if version not in self.versions():
+            raise ValueError(f"Unknown model version: {version}")
+        fd, tmp_path = tempfile.mkstemp(prefix=".current-", dir=self.root)
+        with os.fdopen(fd, "w") as f:
+            f.write(version + "\n")
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_POINTER))
+        print(f"✅ Active model version: {version}")
+
+    def load(self, version=None, model_type="isolation_forest"):
+        """
+        Load a version into a new AnomalyDetector.
+
+        Args:
+            version: Version to load (default: the active one)
+            model_type: AnomalyDetector model type, e.g. 'isolation_forest_compiled'
+
+        Raises:
+            FileNotFoundError: If the registry has no such version
+            ValueError: If the artifact is corrupt or was trained on a
+                different feature schema than the running extractor
+        """
+        version = version or self.current_version()
+        if version is None:
+            raise FileNotFoundError(f"No models registered in {self.root}")
+
+        metadata = self.metadata(version)
+        if metadata.get("feature_schema_hash") != feature_schema_hash():
+            raise ValueError(f"Model {version} was trained on feature schema "
+                             f"{metadata.get('feature_schema_hash')}, extractor uses {feature_schema_hash()}")
+
+        artifact_path = os.path.join(self.root, version, ARTIFACT_NAME)
+        if _file_sha256(artifact_path) != metadata.get("artifact_sha256"):
+            raise ValueError(f"Model {version} artifact does not match its recorded checksum")
+
+        detector = AnomalyDetector(model_type=model_type)
+        detector.load_model(artifact_path)
+        detector.version = version
+        detector.metadata = metadata
+        return detector
+
+
+class ModelWatcher:
+    """
+    Background thread that hot-reloads the detector when CURRENT changes.
+
+    New versions are loaded and validated off the scoring path, then staged
+    on the detector, which swaps them in before its next batch. A version
+    that fails to load is reported once and skipped; the detector keeps
+    scoring with the model it has.
+    """
+
+    def __init__(self, registry, detector, interval=MODEL_WATCH_INTERVAL_S):
+        self.registry = registry
+        self.detector = detector
+        self.interval = interval
+        self.seen = detector.version
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """Load and stage the active version if it changed. Returns True on a swap."""
+        version = self.registry.current_version()
+        if version is None or version == self.seen:
+            return False
+        self.seen = version
+        try:
+            self.detector.stage_update(self.registry.load(version, model_type=self.detector.model_type))
+        except Exception as e:
+            print(f"⚠️  Not swapping to model {version}: {e}")
+            return False
+        print(f"📥 Model {version} loaded, swapping in before the next batch")
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Start watching; a non-positive interval disables hot reload."""
+        if self.interval <= 0:
+            return self
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
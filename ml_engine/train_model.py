@@ -7,7 +7,11 @@ from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, classification_report, confusion_matrix
 import joblib
 import os
+import sys
 from dotenv import load_dotenv
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_engine.model_registry import ModelRegistry
 
 load_dotenv()
 
@@ -120,27 +124,20 @@ def train_isolation_forest(data_path=None, features=None, target_accuracy=0.85):
                 from ml_engine.feature_extractor import FeatureExtractor
                 extractor = FeatureExtractor()
                 
-                # Convert DataFrame rows to dictionaries
-                flows = df.to_dict('records')
-                X_list = []
-                valid_indices = []
-                
-                for idx, flow in enumerate(flows):
-                    features = extractor.extract(flow)
-                    if features is not None:
-                        X_list.append(features[0])
-                        valid_indices.append(idx)
+                # Columnar extraction straight from the DataFrame
+                X, valid_indices = extractor.extract_batch(df, return_indices=True)
+                if X is None:
+                    raise ValueError("No valid flows found in dataset")
                 
-                X = np.array(X_list)
                 print(f"   ✅ Extracted {len(X)} feature vectors with {X.shape[1]} features")
                 
                 # Get labels if they exist
                 if "label" in df.columns:
-                    y = df.loc[valid_indices, "label"].values
+                    y = df["label"].values[valid_indices]
                     print(f"   📊 Found labels: {np.sum(y==1)} anomalies, {np.sum(y==0)} normal")
                 elif "anomaly" in df.columns:
                     # Support "anomaly" column as boolean or 0/1
-                    y = df.loc[valid_indices, "anomaly"].astype(int).values
+                    y = df["anomaly"].astype(int).values[valid_indices]
                     print(f"   📊 Found labels: {np.sum(y==1)} anomalies, {np.sum(y==0)} normal")
                 else:
                     y = None
@@ -329,6 +326,9 @@ def train_isolation_forest(data_path=None, features=None, target_accuracy=0.85):
     joblib.dump(best_model, model_path)
     
     print(f"\n✅ Isolation Forest trained and saved to {model_path}")
+    # Running consumers pick up the new version from the registry without a restart
+    ModelRegistry().publish(best_model, model_type="isolation_forest", params=best_params,
+                            metrics=metrics if y_test is not None else None)
     if y_test is not None:
         if metrics['accuracy'] >= target_accuracy:
             print(f"🎉 Target accuracy of {target_accuracy*100:.1f}% achieved!")
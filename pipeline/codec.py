@@ -0,0 +1,191 @@
+"""Wire codecs for network flow messages shared by the Kafka producer and consumer."""
+import json
+import os
+import socket
+import struct
+import calendar
+import time
+from functools import lru_cache
+from dotenv import load_dotenv
+
+load_dotenv()
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+FLOW_CODEC = os.getenv("FLOW_CODEC", "json")
+
+# Kafka header carrying the codec name; messages without it are sniffed
+CODEC_HEADER = "flow-codec"
+CODECS = ("json", "msgpack", "struct")
+
+# Fixed binary layout: magic, timestamp (us since epoch), src/dst IPv4,
+# protocol code, bytes, packets, duration, src/dst port
+STRUCT_MAGIC = 0xC1  # never a valid first byte in JSON or msgpack
+STRUCT_LAYOUT = struct.Struct("<Bq4s4sBQIdHH")
+PROTOCOL_CODES = {"TCP": 0, "UDP": 1, "ICMP": 2}
+PROTOCOL_NAMES = {code: name for name, code in PROTOCOL_CODES.items()}
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+# Flows in a stream share a handful of distinct seconds, so parsed and
+# formatted seconds are cached to keep date handling off the hot path
+@lru_cache(maxsize=4096)
+def _parse_seconds(text):
+    return calendar.timegm(time.strptime(text, TIMESTAMP_FORMAT))
+
+
+@lru_cache(maxsize=4096)
+def _format_seconds(seconds):
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(seconds))
+
+
+def _parse_timestamp_us(timestamp):
+    """Microseconds since epoch for an ISO 'YYYY-MM-DDTHH:MM:SS[.ffffff]Z' string."""
+    if not isinstance(timestamp, str) or not timestamp.endswith("Z"):
+        raise ValueError("timestamp must be an ISO string ending in 'Z'")
+    text, _, fraction = timestamp[:-1].partition(".")
+    us = _parse_seconds(text) * 1_000_000 + (int(fraction) if fraction else 0)
+    # Rejects variants (e.g. 3-digit fractions) that would not decode identically
+    if _format_timestamp_us(us) != timestamp:
+        raise ValueError("timestamp does not round-trip")
+    return us
+
+
+def _format_timestamp_us(us):
+    seconds, micros = divmod(us, 1_000_000)
+    text = _format_seconds(seconds)
+    return f"{text}.{micros:06d}Z" if micros else f"{text}Z"
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _pack_struct(flow):
+    """Pack a flow into the fixed layout, or raise ValueError if it does not fit exactly."""
+    if set(flow) != {"timestamp", "src_ip", "dst_ip", "protocol", "bytes", "packets",
+                     "duration", "src_port", "dst_port"}:
+        raise ValueError("flow has missing or extra fields")
+    if flow["protocol"] not in PROTOCOL_CODES:
+        raise ValueError("unknown protocol")
+    if not all(_is_int(flow[name]) for name in ("bytes", "packets", "src_port", "dst_port")):
+        raise ValueError("counters and ports must be integers")
+    if not isinstance(flow["duration"], float):
+        raise ValueError("duration must be a float")
+
+    try:
+        return STRUCT_LAYOUT.pack(
+            STRUCT_MAGIC,
+            _parse_timestamp_us(flow["timestamp"]),
+            socket.inet_pton(socket.AF_INET, flow["src_ip"]),
+            socket.inet_pton(socket.AF_INET, flow["dst_ip"]),
+            PROTOCOL_CODES[flow["protocol"]],
+            flow["bytes"],
+            flow["packets"],
+            flow["duration"],
+            flow["src_port"],
+            flow["dst_port"]
+        )
+    except (OSError, TypeError, struct.error) as e:
+        raise ValueError(str(e))
+
+
+def _unpack_struct(payload):
+    (_, timestamp_us, src_ip, dst_ip, protocol, n_bytes, packets,
+     duration, src_port, dst_port) = STRUCT_LAYOUT.unpack(payload)
+    return {
+        "timestamp": _format_timestamp_us(timestamp_us),
+        "src_ip": socket.inet_ntop(socket.AF_INET, src_ip),
+        "dst_ip": socket.inet_ntop(socket.AF_INET, dst_ip),
+        "protocol": PROTOCOL_NAMES[protocol],
+        "bytes": n_bytes,
+        "packets": packets,
+        "duration": duration,
+        "src_port": src_port,
+        "dst_port": dst_port
+    }
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise RuntimeError("msgpack codec requires the msgpack package: pip install msgpack")
+
+
+def encode_flow(flow, codec=FLOW_CODEC):
+    """
+    Encode a flow for Kafka.
+
+    Flows that the struct layout cannot represent exactly (IPv6, unknown
+    protocols, extra fields, ...) fall back to JSON, so the returned codec
+    name is the one actually used.
+
+    Args:
+        flow: Flow dictionary
+        codec: 'json', 'msgpack' or 'struct'
+
+    Returns:
+        tuple: (payload bytes, codec name)
+    """
+    if codec == "struct":
+        try:
+            return _pack_struct(flow), "struct"
+        except ValueError:
+            codec = "json"
+    if codec == "msgpack":
+        _require_msgpack()
+        return msgpack.packb(flow, use_bin_type=True), "msgpack"
+    if codec != "json":
+        raise ValueError(f"Unknown flow codec: {codec}. Must be one of {', '.join(CODECS)}")
+    return json.dumps(flow).encode('utf-8'), "json"
+
+
+def codec_headers(codec):
+    """Kafka headers announcing the codec of a message."""
+    return [(CODEC_HEADER, codec.encode('ascii'))]
+
+
+def codec_from_headers(headers):
+    """Codec named in Kafka headers, or None if absent."""
+    for key, value in headers or ():
+        if key == CODEC_HEADER:
+            return value.decode('ascii')
+    return None
+
+
+def sniff_codec(payload):
+    """Guess the codec of a headerless message from its first byte."""
+    first = payload[:1]
+    if first == bytes([STRUCT_MAGIC]):
+        return "struct"
+    if first in (b"{", b" ", b"\n", b"\t", b"\r"):
+        return "json"
+    return "msgpack"
+
+
+def decode_flow(payload, codec=None):
+    """
+    Decode a Kafka message value into a flow dictionary.
+
+    Args:
+        payload: Message value bytes
+        codec: Codec from the message headers; sniffed when None so plain
+            JSON from older producers keeps working
+    """
+    if codec is None:
+        codec = sniff_codec(payload)
+    if codec == "json":
+        return json.loads(payload.decode('utf-8'))
+    if codec == "struct":
+        return _unpack_struct(payload)
+    if codec == "msgpack":
+        _require_msgpack()
+        return msgpack.unpackb(payload, raw=False)
+    raise ValueError(f"Unknown flow codec: {codec}")
+
+
+def decode_record(record):
+    """Decode a Kafka ConsumerRecord using its codec header."""
+    return decode_flow(record.value, codec_from_headers(getattr(record, "headers", None)))
@@ -0,0 +1,98 @@
+"""Mergeable Space-Saving summaries for approximate top-k counting."""
+import heapq
+
+
+class SpaceSaving:
+    """
+    Approximate counts of the most frequent keys in at most capacity counters.
+
+    Each tracked key has a count and an error: the true count lies in
+    [count - error, count]. A key that is not tracked occurred at most floor
+    times, so every key with a true count above floor is tracked.
+
+    Fed one stream of batches, floor stays at most n / capacity, the
+    Space-Saving bound. Merging summaries of different streams (consumers,
+    windows) keeps both guarantees with floor at most 2 * n / capacity.
+
+    Updates add exact counts (a Counter of one batch, or of one flow in
+    stream mode) with one dict update per key. Up to 2 * capacity counters
+    are kept between compactions, so the smallest counters are only selected
+    and dropped once per capacity new keys instead of on every update.
+    Keeping extra counters only tightens the bounds; to_dict compacts first,
+    so persisted summaries never hold more than capacity counters.
+    """
+
+    def __init__(self, capacity, n=0, floor=0, items=None):
+        """
+        Args:
+            capacity: Maximum number of counters kept
+            n: Total count summarized
+            floor: Upper bound on the count of any key not tracked
+            items: dict key -> [count, error]
+        """
+        self.capacity = capacity
+        self.n = n
+        self.floor = floor
+        self.items = items if items is not None else {}
+
+    def update(self, counts):
+        """Add exact counts, e.g. a Counter of one batch."""
+        items = self.items
+        floor = self.floor
+        for key, count in counts.items():
+            entry = items.get(key)
+            if entry is None:
+                items[key] = [count + floor, floor]
+            else:
+                entry[0] += count
+            self.n += count
+        self._maybe_compact()
+
+    def merge(self, other):
+        """Merge another summary into this one."""
+        items = self.items
+        # A key missing from one side may have occurred up to that side's floor times
+        if other.floor:
+            for key, entry in items.items():
+                if key not in other.items:
+                    entry[0] += other.floor
+                    entry[1] += other.floor
+        for key, (count, error) in other.items.items():
+            entry = items.get(key)
+            if entry is None:
+                items[key] = [count + self.floor, error + self.floor]
+            else:
+                entry[0] += count
+                entry[1] += error
+        self.n += other.n
+        self.floor += other.floor
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        if len(self.items) > 2 * self.capacity:
+            self.compact()
+
+    def compact(self):
+        """Drop all but the capacity largest counters."""
+        if len(self.items) <= self.capacity:
+            return
+        ranked = heapq.nlargest(self.capacity + 1, self.items.items(), key=lambda item: item[1][0])
+        # Dropped keys occurred at most as often as the largest dropped counter
+        self.floor = max(self.floor, ranked[self.capacity][1][0])
+        self.items = dict(ranked[:self.capacity])
+
+    def top(self, k):
+        """The k largest counters as (key, count, error), largest first."""
+        return [(key, count, error) for key, (count, error) in
+                heapq.nlargest(k, self.items.items(), key=lambda item: item[1][0])]
+
+    def to_dict(self):
+        """JSON/BSON-safe representation (keys must be strings), compacted first."""
+        self.compact()
+        return {"capacity": self.capacity, "n": self.n, "floor": self.floor,
+                "items": [[key, count, error] for key, (count, error) in self.items.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["capacity"], n=data["n"], floor=data["floor"],
+                   items={key: [count, error] for key, count, error in data["items"]})
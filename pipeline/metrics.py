@@ -0,0 +1,108 @@
+"""Prometheus metrics for the consumer pipeline and the API."""
+import os
+from contextlib import nullcontext
+from dotenv import load_dotenv
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+except ImportError:  # Metrics are optional; every metric below becomes a no-op
+    prometheus_client = None
+    Counter = Gauge = Histogram = None
+
+load_dotenv()
+
+# Consumer metrics HTTP port (0 disables)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+# Set (to an empty directory) before starting forked consumer workers or
+# several API workers, so every process's metrics are collected
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _NoopMetric:
+    """Stands in for a metric when prometheus_client is not installed."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def set(self, value):
+        pass
+
+    def observe(self, value):
+        pass
+
+    def time(self):
+        return nullcontext()
+
+
+def _metric(kind, *args, **kwargs):
+    return kind(*args, **kwargs) if prometheus_client is not None else _NoopMetric()
+
+
+FLOWS_CONSUMED = _metric(Counter, "netsage_flows_consumed_total", "Flow records polled from Kafka")
+FLOWS_SCORED = _metric(Counter, "netsage_flows_scored_total",
+                       "Flows with valid features scored by the model")
+ANOMALIES = _metric(Counter, "netsage_anomalies_total", "Flows flagged as anomalous")
+STAGE_SECONDS = _metric(Histogram, "netsage_stage_seconds",
+                        "Time spent per batch in each consumer stage (decode, extract, score, write)",
+                        ["stage"], buckets=STAGE_BUCKETS)
+BATCH_SIZES = _metric(Histogram, "netsage_batch_size", "Flows per processed batch",
+                     buckets=BATCH_SIZE_BUCKETS)
+CONSUMER_LAG = _metric(Gauge, "netsage_consumer_lag",
+                       "Messages between the consumer position and the log end, per partition",
+                       ["topic", "partition"], multiprocess_mode="livemax")
+REQUEST_SECONDS = _metric(Histogram, "netsage_api_request_seconds",
+                          "API latency until the response starts, per route template",
+                          ["method", "route", "status"], buckets=REQUEST_BUCKETS)
+
+
+def metrics_enabled():
+    return prometheus_client is not None
+
+
+def _registry():
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return prometheus_client.REGISTRY
+
+
+def render_metrics():
+    """
+    Current metrics in the Prometheus text format.
+
+    Returns:
+        tuple: (body bytes, content type)
+    """
+    return prometheus_client.generate_latest(_registry()), prometheus_client.CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """
+    Serve /metrics on port from a background thread.
+
+    Returns:
+        bool: False when metrics are disabled or prometheus_client is missing
+    """
+    if not port:
+        return False
+    if prometheus_client is None:
+        print("⚠️  Metrics disabled: pip install prometheus-client")
+        return False
+    prometheus_client.start_http_server(port, registry=_registry())
+    print(f"📈 Metrics on http://0.0.0.0:{port}/metrics")
+    return True
+
+
+def mark_process_dead(pid):
+    """Drop an exited worker's live gauges (multiprocess mode only)."""
+    if prometheus_client is not None and PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,50 @@
+"""Conversion between flow timestamp strings and the datetimes stored in MongoDB."""
+from datetime import datetime, timezone
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(text):
+    # fromisoformat only accepts a 'Z' suffix from Python 3.11 on
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    parsed = datetime.fromisoformat(text)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_timestamp(value, default=None):
+    """
+    Convert a flow timestamp to a naive UTC datetime.
+
+    Accepts the producer's 'YYYY-MM-DDTHH:MM:SS[.ffffff]Z' strings as well as
+    offset-less and '+HH:MM' variants; strings without an offset are taken as
+    UTC. Naive UTC matches what pymongo returns when reading BSON dates.
+
+    Args:
+        value: ISO string or datetime
+        default: Returned when value is missing or unparseable
+
+    Returns:
+        datetime or default
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if not isinstance(value, str):
+        return default
+    try:
+        return _parse_iso(value)
+    except ValueError:
+        return default
+
+
+def format_timestamp(value):
+    """Serialize a stored timestamp as an ISO string with a 'Z' suffix (strings pass through)."""
+    if not isinstance(value, datetime):
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds" if value.microsecond else "seconds") + "Z"
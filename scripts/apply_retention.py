@@ -0,0 +1,43 @@
+"""Expire raw flows and fine rollups past their retention, downsampling hours into days."""
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.models.database import get_database
+from api.models.rollups import FLOW_RETENTION_HOURS, MINUTE_ROLLUP_RETENTION_HOURS, HOUR_ROLLUP_RETENTION_DAYS
+from api.models.retention import apply_retention
+
+
+def describe(window, unit):
+    return f"{window:g} {unit}" if window else "forever"
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Apply the retention tiers (FLOW_RETENTION_HOURS, MINUTE_ROLLUP_RETENTION_HOURS, "
+                    "HOUR_ROLLUP_RETENTION_DAYS); safe to run while consumers are writing")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be removed")
+    parser.add_argument("--interval", type=float, default=0,
+                        help="Run again every N seconds (default: run once)")
+    args = parser.parse_args()
+
+    print(f"🗄️  Retention: raw flows {describe(FLOW_RETENTION_HOURS, 'hours')}, "
+          f"minute rollups {describe(MINUTE_ROLLUP_RETENTION_HOURS, 'hours')}, "
+          f"hour rollups {describe(HOUR_ROLLUP_RETENTION_DAYS, 'days')}, day rollups forever")
+    db = get_database()
+    while True:
+        start = time.monotonic()
+        report = apply_retention(db, dry_run=args.dry_run)
+        for step, count in report.items():
+            print(f"   {step}: {count}{' (dry run)' if args.dry_run else ''}")
+        print(f"✅ Retention applied in {time.monotonic() - start:.1f}s")
+        if not args.interval:
+            return
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
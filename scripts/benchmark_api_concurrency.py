@@ -0,0 +1,119 @@
+"""Benchmark API latency under many parallel dashboard clients."""
+import json
+import time
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# The requests one dashboard refresh makes
+DASHBOARD_ENDPOINTS = [
+    "/api/alerts/?limit=100",
+    "/api/alerts/stats/summary",
+    "/api/flows/?limit=100",
+    "/api/flows/stats/summary",
+    "/api/stats/baseline",
+    "/api/stats/time-series?hours=24",
+    "/health",
+]
+
+
+def run_client(base_url, endpoints, deadline, latencies, errors, lock):
+    """Issue requests back to back, cycling through endpoints, until the deadline."""
+    i = 0
+    while time.monotonic() < deadline:
+        path = endpoints[i % len(endpoints)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(base_url + path, timeout=30) as response:
+                response.read()
+        except Exception:
+            with lock:
+                errors[path] = errors.get(path, 0) + 1
+            continue
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.setdefault(path, []).append(elapsed)
+
+
+def run_benchmark(base_url, clients, seconds, endpoints=DASHBOARD_ENDPOINTS):
+    """
+    Run clients parallel request loops for the given duration.
+
+    Returns:
+        dict: Per-endpoint and overall latency percentiles (ms) and throughput
+    """
+    latencies, errors, lock = {}, {}, threading.Lock()
+    deadline = time.monotonic() + seconds
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        for _ in range(clients):
+            pool.submit(run_client, base_url, endpoints, deadline, latencies, errors, lock)
+    elapsed = time.monotonic() - start
+
+    def summarize(values):
+        p50, p95, p99 = np.percentile(values, [50, 95, 99]) * 1000
+        return {"requests": len(values), "p50_ms": round(p50, 1), "p95_ms": round(p95, 1), "p99_ms": round(p99, 1)}
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    if not all_latencies:
+        raise RuntimeError(f"No successful requests against {base_url} (errors: {errors})")
+    return {
+        "clients": clients,
+        "seconds": round(elapsed, 1),
+        "throughput_rps": round(len(all_latencies) / elapsed, 1),
+        "overall": summarize(all_latencies),
+        "endpoints": {path: summarize(values) for path, values in latencies.items()},
+        "errors": errors
+    }
+
+
+def print_results(results, baseline=None):
+    """Print a latency table, with the change against a baseline run when given."""
+    print(f"\n{'endpoint':<34} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          + (f" {'p99 before':>11}" if baseline else ""))
+    rows = list(results["endpoints"].items()) + [("overall", results["overall"])]
+    for path, stats in rows:
+        line = f"{path:<34} {stats['requests']:>9} {stats['p50_ms']:>8} {stats['p95_ms']:>8} {stats['p99_ms']:>8}"
+        if baseline:
+            before = baseline["overall"] if path == "overall" else baseline["endpoints"].get(path)
+            line += f" {before['p99_ms'] if before else '-':>11}"
+        print(line)
+
+    print(f"\n📈 {results['throughput_rps']} req/s with {results['clients']} clients"
+          + (f" (before: {baseline['throughput_rps']} req/s)" if baseline else ""))
+    if results["errors"]:
+        print(f"⚠️  Errors: {results['errors']}")
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark API latency under parallel dashboard clients")
+    parser.add_argument("--url", type=str, default="http://localhost:8000", help="Running API base URL")
+    parser.add_argument("--clients", type=int, default=64, help="Parallel clients")
+    parser.add_argument("--seconds", type=float, default=30, help="Benchmark duration")
+    parser.add_argument("--output", type=str, default=None, help="Save results as JSON")
+    parser.add_argument("--baseline", type=str, default=None,
+                        help="JSON from an earlier run (e.g. before a change) to compare against")
+    args = parser.parse_args()
+
+    print(f"🏁 {args.clients} clients for {args.seconds:.0f}s against {args.url}")
+    results = run_benchmark(args.url.rstrip("/"), args.clients, args.seconds)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Benchmark flow wire codecs: bytes per flow and decode throughput."""
+import sys
+import os
+import time
+import random
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline.codec import encode_flow, decode_flow, CODECS, msgpack
+
+
+def generate_flows(count, random_seed=42):
+    """Flows in the same shape as kafka/producer.py generate_flow."""
+    rng = random.Random(random_seed)
+    return [
+        {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_700_000_000 + i)),
+            "src_ip": f"10.10.0.{rng.randint(1, 50)}",
+            "dst_ip": f"10.20.0.{rng.randint(1, 50)}",
+            "protocol": rng.choice(["TCP", "UDP", "ICMP"]),
+            "bytes": rng.randint(500, 100000),
+            "packets": rng.randint(1, 200),
+            "duration": round(rng.random() * 5, 2),
+            "src_port": rng.randint(1024, 65535),
+            "dst_port": rng.randint(1, 65535)
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark flow wire codecs")
+    parser.add_argument("--flows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    flows = generate_flows(args.flows)
+
+    print(f"{'codec':>8} {'bytes/flow':>11} {'encode/s':>12} {'decode/s':>12}")
+    for codec in CODECS:
+        if codec == "msgpack" and msgpack is None:
+            print(f"{codec:>8}   skipped (pip install msgpack)")
+            continue
+
+        start = time.perf_counter()
+        encoded = [encode_flow(flow, codec) for flow in flows]
+        encode_time = time.perf_counter() - start
+        assert all(used == codec for _, used in encoded), f"{codec} fell back to another codec"
+
+        start = time.perf_counter()
+        decoded = [decode_flow(payload, used) for payload, used in encoded]
+        decode_time = time.perf_counter() - start
+        assert decoded == flows, f"{codec} does not round-trip"
+
+        avg_size = sum(len(payload) for payload, _ in encoded) / len(encoded)
+        print(f"{codec:>8} {avg_size:>11.1f} {len(flows) / encode_time:>12,.0f} "
+              f"{len(flows) / decode_time:>12,.0f}")
+
+    print("✅ All codecs round-trip the generated flows exactly")
+
+
+if __name__ == "__main__":
+    main()
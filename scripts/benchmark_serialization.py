@@ -0,0 +1,122 @@
+"""Benchmark list endpoint serialization: Pydantic models vs raw dicts with orjson."""
+import sys
+import os
+import time
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+from api.models.Alert import Alert
+from api.models.FlowRecord import FlowRecord
+from api.models.responses import FastJSONResponse, orjson
+from api.routes.alerts import alert_dict
+from api.routes.flows import FLOW_FIELDS
+
+
+def generate_docs(count, random_seed=42):
+    """Flow and alert documents as pymongo returns them from the consumer's writes."""
+    rng = random.Random(random_seed)
+    start = datetime(2025, 11, 1)
+    flows, alerts = [], []
+    for i in range(count):
+        flow = {
+            "_id": ObjectId(),
+            "timestamp": start + timedelta(milliseconds=137 * i),
+            "src_ip": f"10.10.0.{rng.randint(1, 50)}",
+            "dst_ip": f"10.20.0.{rng.randint(1, 50)}",
+            "protocol": rng.choice(["TCP", "UDP", "ICMP"]),
+            "bytes": rng.randint(500, 100000),
+            "packets": rng.randint(1, 200),
+            "duration": round(rng.random() * 5, 2),
+            "src_port": rng.randint(1024, 65535),
+            "dst_port": rng.randint(1, 65535)
+        }
+        flows.append(flow)
+        alerts.append({
+            "_id": ObjectId(),
+            "timestamp": flow["timestamp"],
+            "src_ip": flow["src_ip"],
+            "dst_ip": flow["dst_ip"],
+            "protocol": flow["protocol"],
+            "score": rng.random(),
+            "model": "isolation_forest",
+            "model_version": "v0001",
+            "features": {"bytes": flow["bytes"], "packets": flow["packets"], "duration": flow["duration"]},
+            "status": "new"
+        })
+    return flows, alerts
+
+
+def models_path(docs, model, adapter, keep_id):
+    """
+    The previous route path: one model per row, FastAPI's response_model pass
+    and the standard JSONResponse encoder.
+    """
+    rows = []
+    for doc in docs:
+        doc = dict(doc)
+        if keep_id:
+            doc["id"] = str(doc.pop("_id"))
+        else:
+            doc.pop("_id", None)
+        rows.append(model(**doc))
+    # What FastAPI does with a returned model list: dump each model, validate
+    # the dicts against response_model, then dump that to JSON-able data
+    content = adapter.dump_python(adapter.validate_python([row.model_dump() for row in rows]), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(docs, to_row):
+    """The projected raw-dict path rendered by FastJSONResponse."""
+    return FastJSONResponse([to_row(doc) for doc in docs]).body
+
+
+def flow_row(doc):
+    return {name: doc.get(name, default) for name, default in FLOW_FIELDS.items()}
+
+
+def time_per_1000(fn, docs, repeat):
+    """Best-of-repeat milliseconds per 1000 rows."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return 1000 * best * 1000 / len(docs)
+
+
+def main():
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark list endpoint serialization")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per response (the listing limit)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    flows, alerts = generate_docs(args.rows)
+    cases = [
+        ("flows", flows, FlowRecord, False, flow_row),
+        ("alerts", alerts, Alert, True, alert_dict),
+    ]
+
+    print(f"Encoder for the fast path: {'orjson' if orjson else 'json (pip install orjson)'}")
+    print(f"{'endpoint':>8} {'models ms/1k':>13} {'fast ms/1k':>11} {'speedup':>8}")
+    for name, docs, model, keep_id, to_row in cases:
+        adapter = TypeAdapter(List[model])
+        before = models_path(docs, model, adapter, keep_id)
+        after = fast_path(docs, to_row)
+        assert json.loads(before) == json.loads(after), f"{name}: fast path output differs"
+
+        before_ms = time_per_1000(lambda d: models_path(d, model, adapter, keep_id), docs, args.repeat)
+        after_ms = time_per_1000(lambda d: fast_path(d, to_row), docs, args.repeat)
+        print(f"{name:>8} {before_ms:>13.2f} {after_ms:>11.2f} {before_ms / after_ms:>7.1f}x")
+
+    print("✅ Both paths produce the same JSON")
+
+
+if __name__ == "__main__":
+    main()
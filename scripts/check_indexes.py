@@ -0,0 +1,36 @@
+"""Check that every API query shape is served by an index (no COLLSCAN, no in-memory SORT)."""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.models.database import get_database
+from api.models.indexes import ensure_indexes, explain_query_shapes
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Explain each API route query and fail on collection scans")
+    parser.add_argument("--no-ensure", action="store_true",
+                        help="Only check; do not create missing indexes first")
+    args = parser.parse_args()
+
+    db = get_database()
+    if not args.no_ensure:
+        ensure_indexes(db)
+
+    results = explain_query_shapes(db)
+    for result in results:
+        marker = "✅" if result["ok"] else "❌"
+        print(f"{marker} {result['description']:<48} {' <- '.join(result['stages'])} "
+              f"[{', '.join(result['indexes']) or 'no index'}]")
+
+    failed = [result for result in results if not result["ok"]]
+    if failed:
+        print(f"\n❌ {len(failed)}/{len(results)} query shapes need a collection scan or in-memory sort")
+        sys.exit(1)
+    print(f"\n✅ All {len(results)} query shapes are served by indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -56,20 +56,11 @@ def evaluate_model_on_test_data(test_data_path, model_path=None):
     print("\n📊 Extracting features from test data...")
     extractor = FeatureExtractor()
     
-    flows = df.to_dict('records')
-    X_test = []
-    y_true = []
-    valid_indices = []
-    
-    for idx, flow in enumerate(flows):
-        features = extractor.extract(flow)
-        if features is not None:
-            X_test.append(features[0])
-            y_true.append(df.loc[idx, 'label'])
-            valid_indices.append(idx)
-    
-    X_test = np.array(X_test)
-    y_true = np.array(y_true)
+    X_test, valid_indices = extractor.extract_batch(df, return_indices=True)
+    if X_test is None:
+        print("❌ No valid flows found in test dataset")
+        return
+    y_true = df['label'].values[valid_indices]
     
     print(f"   ✅ Extracted {len(X_test)} feature vectors")
     print(f"   Labels: {np.sum(y_true==1)} anomalies, {np.sum(y_true==0)} normal")
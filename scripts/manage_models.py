@@ -0,0 +1,58 @@
+"""List, register and activate versions in the model registry."""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+from ml_engine.model_registry import ModelRegistry, MODEL_REGISTRY_DIR
+
+
+def list_versions(registry):
+    """Print every registered version with its headline metrics."""
+    versions = registry.versions()
+    if not versions:
+        print(f"📭 No models registered in {registry.root}")
+        return
+
+    current = registry.current_version()
+    print(f"{'':2}{'version':<8} {'created':<21} {'type':<18} {'accuracy':>9} {'f1':>7}  schema")
+    for version in versions:
+        metadata = registry.metadata(version)
+        metrics = metadata.get("metrics", {})
+        accuracy = f"{metrics['accuracy']:.4f}" if "accuracy" in metrics else "-"
+        f1 = f"{metrics['f1_score']:.4f}" if "f1_score" in metrics else "-"
+        marker = "▶ " if version == current else "  "
+        print(f"{marker}{version:<8} {metadata.get('created_at', '-'):<21} {metadata.get('model_type', '-'):<18} "
+              f"{accuracy:>9} {f1:>7}  {metadata.get('feature_schema_hash')}")
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Manage the versioned model registry")
+    parser.add_argument("--registry", type=str, default=MODEL_REGISTRY_DIR,
+                        help="Registry directory (default: MODEL_REGISTRY_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List registered versions")
+    activate = commands.add_parser("activate", help="Make a version active (running consumers swap to it)")
+    activate.add_argument("version")
+    register = commands.add_parser("register", help="Register an existing model file, e.g. isolation_forest.pkl")
+    register.add_argument("model_path")
+    register.add_argument("--model-type", type=str, default="isolation_forest")
+    register.add_argument("--no-activate", action="store_true", help="Register without activating")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.registry)
+    if args.command == "list":
+        list_versions(registry)
+    elif args.command == "activate":
+        registry.activate(args.version)
+    else:
+        model = joblib.load(args.model_path)
+        registry.publish(model, model_type=args.model_type,
+                         params=model.get_params() if hasattr(model, "get_params") else None,
+                         activate=not args.no_activate)
+
+
+if __name__ == "__main__":
+    main()
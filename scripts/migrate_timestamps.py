@@ -0,0 +1,103 @@
+"""Convert string timestamps in flows and anomalies to native BSON datetimes."""
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import ASCENDING, UpdateOne
+from api.models.database import get_database
+from pipeline.timestamps import parse_timestamp
+
+COLLECTIONS = ("flows", "anomalies")
+# Progress is checkpointed here so an interrupted run resumes where it stopped
+MIGRATIONS_COLLECTION = "migrations"
+
+
+def migrate_collection(db, name, batch_size=5000, dry_run=False, restart=False):
+    """
+    Rewrite string timestamps in one collection, batch by batch in _id order.
+
+    Each batch only matches documents whose timestamp is still a string, so
+    re-running (or racing a consumer that already writes datetimes) is safe.
+    The last _id of every written batch is checkpointed, so a restarted run
+    scans from there instead of from the start of the collection.
+
+    Returns:
+        dict: Counts of converted and unparseable documents
+    """
+    collection = db[name]
+    checkpoint_id = f"timestamps_to_date:{name}"
+    if restart and not dry_run:
+        db[MIGRATIONS_COLLECTION].delete_one({"_id": checkpoint_id})
+    checkpoint = {} if restart else db[MIGRATIONS_COLLECTION].find_one({"_id": checkpoint_id}) or {}
+    last_id = checkpoint.get("last_id")
+    converted = checkpoint.get("converted", 0)
+    unparseable = checkpoint.get("unparseable", 0)
+
+    if checkpoint.get("done"):
+        print(f"✅ {name}: already migrated ({converted} documents converted)")
+        return {"converted": converted, "unparseable": unparseable}
+
+    remaining = collection.count_documents({"timestamp": {"$type": "string"}})
+    print(f"🔄 {name}: {remaining} documents with string timestamps"
+          + (f", resuming after {last_id}" if last_id else ""))
+
+    start = time.monotonic()
+    while True:
+        query = {"timestamp": {"$type": "string"}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query, {"timestamp": 1}).sort("_id", ASCENDING).limit(batch_size))
+        if not batch:
+            break
+
+        requests = []
+        for doc in batch:
+            parsed = parse_timestamp(doc["timestamp"])
+            if parsed is None:
+                unparseable += 1
+                continue
+            # Matching on the old value leaves documents changed since the read alone
+            requests.append(UpdateOne({"_id": doc["_id"], "timestamp": doc["timestamp"]},
+                                      {"$set": {"timestamp": parsed}}))
+
+        if requests and not dry_run:
+            converted += collection.bulk_write(requests, ordered=False).modified_count
+        elif dry_run:
+            converted += len(requests)
+
+        last_id = batch[-1]["_id"]
+        if not dry_run:
+            db[MIGRATIONS_COLLECTION].update_one(
+                {"_id": checkpoint_id},
+                {"$set": {"last_id": last_id, "converted": converted, "unparseable": unparseable}},
+                upsert=True
+            )
+        elapsed = time.monotonic() - start
+        print(f"   {name}: {converted} converted, {unparseable} unparseable "
+              f"({converted / max(elapsed, 1e-9):.0f} docs/s)")
+
+    if not dry_run:
+        db[MIGRATIONS_COLLECTION].update_one({"_id": checkpoint_id}, {"$set": {"done": True}}, upsert=True)
+    print(f"✅ {name}: {converted} converted, {unparseable} left as strings (unparseable)")
+    return {"converted": converted, "unparseable": unparseable}
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(description="Migrate string timestamps to BSON datetimes")
+    parser.add_argument("--collections", type=str, default=",".join(COLLECTIONS),
+                        help="Comma-separated collections to migrate")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--dry-run", action="store_true", help="Count what would change without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore saved checkpoints and scan from the start")
+    args = parser.parse_args()
+
+    db = get_database()
+    for name in [name.strip() for name in args.collections.split(",") if name.strip()]:
+        migrate_collection(db, name, batch_size=args.batch_size, dry_run=args.dry_run, restart=args.restart)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Regenerate the flow/anomaly rollup collections from raw data."""
+import sys
+import os
+import time
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.models.database import get_database
+from api.models.rollups import rebuild_rollups, retention_cutoffs
+from api.models.top_talkers import rebuild_top_talkers
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Rebuild per-minute and per-hour rollups and the top talkers sketches from the flows "
+                    "and anomalies collections "
+                    "(stop the consumers first: increments written during the rebuild are lost)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    print("🔄 Rebuilding rollups and top talkers from raw flows and anomalies...")
+    start = time.monotonic()
+    # Buckets older than the raw flow retention can no longer be recomputed, so they are kept
+    written = rebuild_rollups(get_database(), batch_size=args.batch_size,
+                              keep_before=retention_cutoffs()["flows"])
+    for name, count in written.items():
+        print(f"   {name}: {count} buckets")
+    for field, count in rebuild_top_talkers(get_database()).items():
+        print(f"   top talkers {field}: {count} IPs")
+    print(f"✅ Rollups rebuilt in {time.monotonic() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Rebuild the alert summary counters from the anomalies collection and report drift."""
+import sys
+import os
+import argparse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.models.database import get_database
+from api.models.alert_counters import reconcile_alert_counters
+
+
+def main():
+    """Main function."""
+    parser = argparse.ArgumentParser(
+        description="Recount alerts by status and reset the counters document used by /api/alerts/stats/summary")
+    parser.add_argument("--dry-run", action="store_true", help="Report drift without rewriting the counters")
+    args = parser.parse_args()
+
+    drift = reconcile_alert_counters(get_database(), dry_run=args.dry_run)
+    if not drift:
+        print("✅ Alert counters match the anomalies collection")
+        return
+
+    print("⚠️  Alert counters drifted:")
+    for field, (stored, actual) in drift.items():
+        print(f"   {field}: stored {stored}, actual {actual} ({actual - stored:+})")
+    if args.dry_run:
+        print("   Dry run: counters left unchanged")
+        sys.exit(1)
+    print("✅ Counters reset to the recounted values")
+
+
+if __name__ == "__main__":
+    main()
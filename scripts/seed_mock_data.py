@@ -4,6 +4,9 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from api.models.database import get_database
+from api.models.rollups import rebuild_rollups, DAY_ROLLUP_COLLECTION
+from api.models.alert_counters import reconcile_alert_counters
+from api.models.top_talkers import rebuild_top_talkers
 import random
 from datetime import datetime, timedelta
 import time
@@ -14,7 +17,7 @@ def generate_mock_flows(count=1000):
     base_time = datetime.utcnow() - timedelta(hours=24)
     
     for i in range(count):
-        timestamp = (base_time + timedelta(seconds=i*10)).isoformat() + "Z"
+        timestamp = base_time + timedelta(seconds=i*10)
         flow = {
             "timestamp": timestamp,
             "src_ip": f"10.10.0.{random.randint(1, 50)}",
@@ -37,7 +40,7 @@ def generate_mock_anomalies(count=50):
     base_time = datetime.utcnow() - timedelta(hours=24)
     
     for i in range(count):
-        timestamp = (base_time + timedelta(minutes=i*30)).isoformat() + "Z"
+        timestamp = base_time + timedelta(minutes=i*30)
         anomaly = {
             "timestamp": timestamp,
             "src_ip": f"10.10.0.{random.randint(1, 50)}",
@@ -69,6 +72,8 @@ def main():
     print("🗑️  Clearing existing data...")
     flows_collection.delete_many({})
     anomalies_collection.delete_many({})
+    # Downsampled days of the cleared flows; the rebuild below replaces the finer rollups
+    db[DAY_ROLLUP_COLLECTION].delete_many({})
     
     # Generate and insert flows
     print("📊 Generating mock flows...")
@@ -82,6 +87,12 @@ def main():
     anomalies_collection.insert_many(anomalies)
     print(f"✅ Inserted {len(anomalies)} anomalies")
     
+    # Seeded documents bypass the consumer, so derive the stats rollups from them
+    rebuild_rollups(db)
+    reconcile_alert_counters(db)
+    rebuild_top_talkers(db)
+    print("✅ Rebuilt stats rollups, alert counters and top talkers")
+    
     print("\n✅ Database seeded successfully!")
     print(f"   Total flows: {flows_collection.count_documents({})}")
     print(f"   Total anomalies: {anomalies_collection.count_documents({})}")